@@ -0,0 +1,88 @@
+from cardinality import exactly_one
+
+
+def line_automaton(length, hint_numbers, hint_colors):
+    """
+    Compile the hints of one line into a nondeterministic automaton that reads the line cell by cell.
+
+    The states are, in order: the gap before block 0, one state per cell of block 0, the gap before block 1, ... and
+    the gap after the last block. A gap state means the cell is empty, a block state that the cell has the color of
+    its block. Blocks of the same color need a gap between them, blocks of different colors may touch.
+
+    Every state can only be taken on a window of positions: a block can start no earlier than the blocks before it
+    allow and no later than the blocks after it allow, the same range the block start encoding uses.
+
+    Returns:
+    - colors: The color of every state, None for the gaps.
+    - windows: The first and last position of every state (first > last if the state can never be taken).
+    - successors: The states every state can be followed by on the next cell.
+    """
+    num_blocks = len(hint_numbers)
+    earliest = []
+    position = 0
+    for block_index, block in enumerate(hint_numbers):
+        earliest.append(position)
+        position += block
+        if block_index < num_blocks - 1 and hint_colors[block_index] == hint_colors[block_index + 1]:
+            position += 1
+    slack = length - position  # how far every block can be pushed to the right
+
+    colors, windows, successors = [], [], []
+    for block_index in range(num_blocks + 1):
+        # The gap before this block (or after the last one)
+        gap = len(colors)
+        first = earliest[block_index - 1] + hint_numbers[block_index - 1] if block_index > 0 else 0
+        last = earliest[block_index] + slack - 1 if block_index < num_blocks else length - 1
+        colors.append(None)
+        windows.append((first, last))
+        successors.append([gap] if block_index == num_blocks else [gap, gap + 1])
+        if block_index == num_blocks:
+            break
+
+        block, color = hint_numbers[block_index], hint_colors[block_index]
+        for offset in range(block):
+            colors.append(color)
+            windows.append((earliest[block_index] + offset, earliest[block_index] + slack + offset))
+            state = len(colors) - 1
+            if offset < block - 1:
+                successors.append([state + 1])
+            elif block_index < num_blocks - 1 and hint_colors[block_index + 1] != color:
+                # The next block may follow right away: the gap after this block or its first cell
+                successors.append([state + 1, state + 2])
+            else:
+                successors.append([state + 1])
+
+    return colors, windows, successors
+
+
+def encode_line_automaton(pool, clauses, line, hint_numbers, hint_colors, filled_with, encoding="auto"):
+    """
+    Encode one line as a layered automaton: one variable per position and state the automaton can be in there.
+
+    Exactly one state holds at every position, a state fixes its cell (empty, or filled with the color of its block)
+    and implies one of its successors on the next position. The windows of line_automaton already leave only the
+    initial states on the first position and the accepting states on the last one, so no extra clauses are needed
+    for them. This needs O(n × s) variables and clauses for a line of n cells and s states within reach of each
+    position, no matter how many placements the line has.
+
+    Parameters:
+    - pool: The IDPool of the encoder, the state variables are taken from it.
+    - clauses: Receives the clauses.
+    - line: The variable ids of the cells in traversal order.
+    - filled_with: filled_with(cell_id, color) gives the variable saying the cell has the color.
+    - encoding: The at-most-one encoding for the states of a position, see cardinality.exactly_one.
+    """
+    colors, windows, successors = line_automaton(len(line), hint_numbers, hint_colors)
+    states = [{} for _ in line]
+    for state, (first, last) in enumerate(windows):
+        for position in range(max(first, 0), min(last, len(line) - 1) + 1):
+            states[position][state] = pool.id()
+
+    for position, cell in enumerate(line):
+        clauses.extend(exactly_one(pool, list(states[position].values()), encoding))
+        for state, variable in states[position].items():
+            color = colors[state]
+            clauses.append([-variable, -cell] if color is None else [-variable, filled_with(cell, color)])
+            if position + 1 < len(line):
+                following = states[position + 1]
+                clauses.append([-variable, *(following[nxt] for nxt in successors[state] if nxt in following)])
@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import main
+
+PHASES = ["parse", "propagate", "encode", "solve", "write"]
+
+
+def collect_puzzles(paths):
+    # Directories contribute all their .clues files, everything else is treated as a glob pattern
+    puzzles = []
+    for path in paths:
+        if os.path.isdir(path):
+            puzzles.extend(sorted(str(p) for p in pathlib.Path(path).glob('*.clues')))
+        else:
+            puzzles.extend(sorted(glob.glob(path)))
+    return puzzles
+
+
+def solve_in_worker(filename, time_limit):
+    # Runs in a worker process, the solver's progress messages are not wanted in the summary
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            result = main.solve(filename, time_limit)
+        except Exception as error:
+            result = {"file": filename, "status": f"error: {error}"}
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def print_summary(results):
+    name_width = max([len(pathlib.Path(result["file"]).stem) for result in results] + [6])
+    print(f'{"puzzle":<{name_width}}  {"status":<12}' + ''.join(f'{phase:>10}' for phase in PHASES + ["total"]))
+
+    totals = dict.fromkeys(PHASES + ["total"], 0.0)
+    statuses = {}
+    for result in sorted(results, key=lambda r: r["file"]):
+        row = f'{pathlib.Path(result["file"]).stem:<{name_width}}  {result["status"][:12]:<12}'
+        for phase in PHASES + ["total"]:
+            if phase in result:
+                totals[phase] += result[phase]
+                row += f'{result[phase]:>10.3f}'
+            else:
+                row += f'{"-":>10}'
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        print(row)
+
+    print(f'{"total":<{name_width}}  {"":<12}' + ''.join(f'{totals[phase]:>10.3f}' for phase in PHASES + ["total"]))
+    print()
+    print(', '.join(f'{status}: {number}' for status, number in sorted(statuses.items())))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Solve many nonograms in parallel.')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of .clues files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--timeout', type=float, default=None, help='SAT time limit per puzzle in seconds')
+    parser.add_argument('--profile', default=None,
+                        help='append the measurements of every puzzle to this JSON lines file')
+    args = parser.parse_args()
+
+    puzzles = collect_puzzles(args.paths)
+    if not puzzles:
+        print('No .clues files found')
+        return
+
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(solve_in_worker, puzzle, args.timeout) for puzzle in puzzles]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f'{result["status"]:<12} {result["file"]}')
+            results.append(result)
+
+    if args.profile:
+        with open(args.profile, 'a') as file:
+            for result in sorted(results, key=lambda r: r["file"]):
+                file.write(json.dumps(result, sort_keys=True) + "\n")
+
+    print()
+    print_summary(results)
+    print(f'Solved {len(puzzles)} puzzles in {time.perf_counter() - started:.2f} seconds')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,191 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import pathlib
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module, the peak RSS is left out there
+    resource = None
+
+import combinations
+import main
+from batch import collect_puzzles
+from puzzle import read_puzzle
+
+CORPORA = ["clues", "generated", "randomly_generated"]
+APPROACHES = ["block-start", "combinations", "automaton"]
+BASELINE = "benchmark_baseline.json"
+THRESHOLD = 0.2  # a bucket that got more than 20% slower than the baseline is a regression
+
+
+def encode(approach, puzzle):
+    # Integer clauses of the puzzle without any line propagation, so only the encoders are compared
+    shape, hints = puzzle.shape, puzzle.hints
+    if approach == "block-start":
+        return main.generate_int_cnf(shape, hints)
+    if approach == "combinations":
+        return combinations.sympy_to_cnf(shape, combinations.generate_dnf(shape, hints))
+    if approach == "automaton":
+        return main.Encoder(shape, hints, line_encoding="automaton").encode()
+    raise ValueError(f"Unknown approach {approach!r}, expected one of {APPROACHES}")
+
+
+def bucket_of(puzzle):
+    # e.g. "rect 20 20 monochrome" or "hex 5 colored"
+    return f"{' '.join(puzzle.shape)} {'colored' if puzzle.colored else 'monochrome'}"
+
+
+def run_job(filename, approach, connection):
+    # Runs in a fresh process, so the peak RSS belongs to this puzzle alone
+    with contextlib.redirect_stdout(io.StringIO()):
+        puzzle = read_puzzle(filename)
+        started = time.perf_counter()
+        clauses = encode(approach, puzzle)
+        encode_time = time.perf_counter() - started
+
+        stats = {}
+        started = time.perf_counter()
+        model = main.clause_solver(clauses, None, stats)
+        solve_time = time.perf_counter() - started
+
+    result = {
+        "status": "sat" if model else "unsat",
+        "encode": encode_time,
+        "solve": solve_time,
+        "variables": stats["variables"],
+        "clauses": stats["clauses"],
+    }
+    if resource is not None:
+        result["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # ru_maxrss is in KiB on Linux
+    connection.send(result)
+
+
+def benchmark(filename, approach, timeout):
+    # Encode and solve one puzzle in a child process, which is killed once the timeout is over
+    puzzle = read_puzzle(filename)
+    result = {"file": str(filename), "approach": approach, "bucket": bucket_of(puzzle)}
+
+    # Fork where the platform has it, the default start method (spawn on Windows) everywhere else
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run_job, args=(filename, approach, sender))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        try:
+            result.update(receiver.recv())
+        except EOFError:
+            result["status"] = "error"
+    else:
+        process.kill()
+        result["status"] = "timeout"
+    process.join()
+    if "status" not in result:
+        result["status"] = "error"
+    return result
+
+
+def summarize(results, timeout):
+    # Totals per approach and bucket, a puzzle that ran out of time counts with the whole timeout
+    summary = {}
+    for result in results:
+        totals = summary.setdefault(result["approach"], {}).setdefault(result["bucket"], {
+            "puzzles": 0, "timeouts": 0, "errors": 0, "encode": 0.0, "solve": 0.0, "time": 0.0,
+            "variables": 0, "clauses": 0, "peak_rss": 0})
+        totals["puzzles"] += 1
+        if result["status"] == "timeout":
+            totals["timeouts"] += 1
+            totals["time"] += timeout
+        elif "encode" not in result:
+            totals["errors"] += 1
+        else:
+            for key in ("encode", "solve", "variables", "clauses"):
+                totals[key] += result[key]
+            totals["time"] += result["encode"] + result["solve"]
+            totals["peak_rss"] = max(totals["peak_rss"], result.get("peak_rss", 0))
+    return summary
+
+
+def print_summary(summary):
+    print(f'{"approach":<13} {"bucket":<28} {"puzzles":>7} {"timeouts":>8} {"encode s":>9} {"solve s":>9} '
+          f'{"variables":>10} {"clauses":>10} {"peak MB":>8}')
+    for approach, buckets in sorted(summary.items()):
+        for bucket, totals in sorted(buckets.items()):
+            print(f'{approach:<13} {bucket:<28} {totals["puzzles"]:>7} {totals["timeouts"]:>8} '
+                  f'{totals["encode"]:>9.3f} {totals["solve"]:>9.3f} {totals["variables"]:>10} '
+                  f'{totals["clauses"]:>10} {totals["peak_rss"] / 2 ** 20:>8.1f}')
+
+
+def regressions(summary, baseline, threshold):
+    # Buckets whose total time grew by more than threshold compared to the baseline, or that have new timeouts
+    found = []
+    for approach, buckets in summary.items():
+        for bucket, totals in buckets.items():
+            before = baseline.get(approach, {}).get(bucket)
+            if before is None:
+                continue
+            if totals["time"] > before["time"] * (1 + threshold):
+                found.append(f'{approach} / {bucket}: {before["time"]:.3f} s -> {totals["time"]:.3f} s')
+            if totals["timeouts"] > before["timeouts"]:
+                found.append(f'{approach} / {bucket}: {before["timeouts"]} -> {totals["timeouts"]} timeouts')
+    return found
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark the encoders over the puzzle corpora.')
+    parser.add_argument('paths', nargs='*', default=CORPORA, help='directories or glob patterns of .clues files')
+    parser.add_argument('--approach', nargs='+', choices=APPROACHES, default=APPROACHES)
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per puzzle and approach')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON file with the bucket totals to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed slowdown per bucket (0.2 = 20%%)')
+    parser.add_argument('--output', default=None, help='append the result of every puzzle to this JSON lines file')
+    args = parser.parse_args()
+
+    puzzles = collect_puzzles(args.paths)
+    if not puzzles:
+        print('No .clues files found')
+        return 0
+
+    results = []
+    for filename in puzzles:
+        for approach in args.approach:
+            result = benchmark(filename, approach, args.timeout)
+            print(f'{approach:<13} {result["status"]:<8} {result["file"]}')
+            results.append(result)
+
+    if args.output:
+        with open(args.output, 'a') as file:
+            for result in results:
+                file.write(json.dumps(result, sort_keys=True) + "\n")
+
+    summary = summarize(results, args.timeout)
+    print()
+    print_summary(summary)
+
+    baseline_path = pathlib.Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n")
+        print(f'Baseline written to {baseline_path}')
+        return 0
+    if not baseline_path.exists():
+        print(f'No baseline at {baseline_path}, run with --save-baseline to create one')
+        return 0
+
+    found = regressions(summary, json.loads(baseline_path.read_text()), args.threshold)
+    print()
+    for regression in found:
+        print(f'Slower than the baseline: {regression}')
+    if not found:
+        print(f'No bucket is more than {args.threshold:.0%} slower than the baseline')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
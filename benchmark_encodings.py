@@ -0,0 +1,41 @@
+import contextlib
+import io
+import pathlib
+import sys
+import time
+
+import main
+from cardinality import AT_MOST_ONE
+
+# Usage: benchmark_encodings.py [directory] [encoding ...]
+puzzle_dir = pathlib.Path(sys.argv[1]) if len(sys.argv) > 1 else pathlib.Path(__file__).parent / 'clues'
+encodings = sys.argv[2:] or ["auto", *AT_MOST_ONE]
+
+print(f'{"puzzle":<20} {"encoding":<11} {"variables":>9} {"clauses":>9} {"encode s":>9} {"solve s":>9}  result')
+
+totals = {encoding: [0, 0.0, 0.0] for encoding in encodings}
+
+for clues_path in sorted(puzzle_dir.glob('*.clues')):
+    for encoding in encodings:
+        main.EXACTLY_ONE = encoding
+        with contextlib.redirect_stdout(io.StringIO()):
+            shape, color, hints = main.get_content(clues_path)
+
+            start = time.perf_counter()
+            clauses = main.generate_int_cnf(shape, hints)
+            encode_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model = main.clause_solver(clauses)
+            solve_time = time.perf_counter() - start
+
+        num_variables = max(abs(literal) for clause in clauses for literal in clause)
+        totals[encoding][0] += len(clauses)
+        totals[encoding][1] += encode_time
+        totals[encoding][2] += solve_time
+        print(f'{clues_path.stem:<20} {encoding:<11} {num_variables:>9} {len(clauses):>9} {encode_time:>9.3f} '
+              f'{solve_time:>9.3f}  {"SAT" if model else "UNSAT"}')
+
+print()
+for encoding, (num_clauses, encode_time, solve_time) in totals.items():
+    print(f'{"total":<20} {encoding:<11} {"":>9} {num_clauses:>9} {encode_time:>9.3f} {solve_time:>9.3f}')
@@ -0,0 +1,72 @@
+import pathlib
+import random
+import sys
+import time
+
+import numpy as np
+
+import main
+from generator import DENSITY, clues_text, random_cells, random_palette
+from hex_geometry import HexGeometry
+from puzzle import parse_puzzle, read_puzzle
+
+# Usage: benchmark_hex.py [directory]
+# Encodes random hex boards of growing edge length and the hex 21 puzzles of a directory (clues/ by default), and shows
+# how the time for the line geometry and the whole encoding grows with the number of cells.
+#
+# The geometry is linear in the cells. The encoding is not: the block start rules cost O(starts × block length) per
+# block, and on a longer line there are more blocks, each with more possible starts, so the clauses per cell grow with
+# the edge length. The time per clause stays flat, which is what the last fit shows.
+puzzle_dir = pathlib.Path(sys.argv[1]) if len(sys.argv) > 1 else pathlib.Path(__file__).parent / 'clues'
+EDGES = range(3, 22, 2)
+REPEATS = 5
+
+
+def best_time(function, repeats=REPEATS):
+    # Fastest of a few runs, the others mostly measure whatever else the machine was doing
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(puzzle):
+    edge = puzzle.dimensions[0]
+    geometry_time = best_time(lambda: HexGeometry(edge))
+
+    def encode():
+        main.line_template.cache_clear()
+        return main.Encoder(puzzle.shape, puzzle.hints).encode()
+
+    return len(HexGeometry(edge).cells), len(encode()), geometry_time, best_time(encode)
+
+
+def row(name, cells, clauses, geometry_time, encode_time):
+    print(f'{name:<20} {cells:>7} {clauses:>9} {geometry_time * 1000:>11.3f} {geometry_time / cells * 1e6:>9.3f} '
+          f'{encode_time * 1000:>11.3f} {encode_time / cells * 1e6:>9.3f} {encode_time / clauses * 1e6:>9.3f}')
+
+
+print(f'{"puzzle":<20} {"cells":>7} {"clauses":>9} {"geometry ms":>11} {"µs/cell":>9} '
+      f'{"encode ms":>11} {"µs/cell":>9} {"µs/clause":>9}')
+rng = random.Random(0)
+sizes = []
+for edge in EDGES:
+    text = clues_text("hex", (edge,), random_palette(2, rng), random_cells("hex", (edge,), 2, DENSITY, rng))
+    puzzle, _ = parse_puzzle(iter(text.splitlines()))
+    result = measure(puzzle)
+    sizes.append(result)
+    row(f'random hex {edge}', *result)
+
+for clues_path in sorted(puzzle_dir.glob('*.clues')):
+    puzzle = read_puzzle(clues_path)
+    if puzzle.kind == "hex" and puzzle.dimensions[0] == 21:
+        row(clues_path.stem, *measure(puzzle))
+
+# Slope of log(time) over log(size): 1 means the time grows linearly with the number of cells or clauses
+cells, clauses, geometry_times, encode_times = (np.array(values) for values in zip(*sizes))
+for name, size, unit, times in (("geometry", cells, "cells", geometry_times), ("encode", cells, "cells", encode_times),
+                                ("encode", clauses, "clauses", encode_times)):
+    slope = np.polyfit(np.log(size), np.log(times), 1)[0]
+    print(f'{name} time grows like {unit}^{slope:.2f} ({size[0]} to {size[-1]} {unit})')
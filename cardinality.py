@@ -0,0 +1,105 @@
+from math import ceil, sqrt
+from pysat.card import CardEnc, EncType
+
+# "auto" keeps the pairwise encoding for blocks with at most this many starts, since it needs no helper variables
+PAIRWISE_LIMIT = 6
+# Encoding used by PySAT for the "cardenc" option
+CARDENC_TYPE = EncType.ladder
+
+
+def at_most_one_pairwise(pool, literals):
+    # No two literals are true simultaneously, O(k²) clauses
+    clauses = []
+    for i in range(len(literals)):
+        for j in range(i + 1, len(literals)):
+            clauses.append([-literals[i], -literals[j]])
+    return clauses
+
+
+def at_most_one_sequential(pool, literals):
+    # Sinz sequential counter: s_i is true if one of the first i literals is true, O(k) clauses
+    if len(literals) <= 1:
+        return []
+
+    clauses = []
+    previous = pool.id()
+    clauses.append([-literals[0], previous])
+    for literal in literals[1:-1]:
+        current = pool.id()
+        clauses.append([-literal, current])
+        clauses.append([-previous, current])
+        clauses.append([-literal, -previous])
+        previous = current
+    clauses.append([-literals[-1], -previous])
+    return clauses
+
+
+def at_most_one_commander(pool, literals, group_size=3):
+    # Klieber-Kwon commander encoding: pairwise inside small groups, one commander per group,
+    # and at most one commander is true
+    if len(literals) <= group_size + 1:
+        return at_most_one_pairwise(pool, literals)
+
+    clauses = []
+    commanders = []
+    for i in range(0, len(literals), group_size):
+        group = literals[i:i + group_size]
+        commander = pool.id()
+        commanders.append(commander)
+        clauses.extend(at_most_one_pairwise(pool, group))
+        for literal in group:
+            clauses.append([-literal, commander])
+    clauses.extend(at_most_one_commander(pool, commanders, group_size))
+    return clauses
+
+
+def at_most_one_product(pool, literals):
+    # Chen's 2-product encoding: every literal is placed on a p x q grid and implies its row and column
+    if len(literals) <= 4:
+        return at_most_one_pairwise(pool, literals)
+
+    p = ceil(sqrt(len(literals)))
+    q = ceil(len(literals) / p)
+    rows = [pool.id() for _ in range(p)]
+    cols = [pool.id() for _ in range(q)]
+
+    clauses = []
+    for k, literal in enumerate(literals):
+        clauses.append([-literal, rows[k // q]])
+        clauses.append([-literal, cols[k % q]])
+    clauses.extend(at_most_one_product(pool, rows))
+    clauses.extend(at_most_one_product(pool, cols))
+    return clauses
+
+
+def at_most_one_cardenc(pool, literals):
+    if len(literals) <= 1:
+        return []
+    return CardEnc.atmost(lits=list(literals), bound=1, vpool=pool, encoding=CARDENC_TYPE).clauses
+
+
+AT_MOST_ONE = {
+    "pairwise": at_most_one_pairwise,
+    "sequential": at_most_one_sequential,
+    "commander": at_most_one_commander,
+    "product": at_most_one_product,
+    "cardenc": at_most_one_cardenc,
+}
+
+
+def choose_encoding(size):
+    # The encoding "auto" uses for a block with size starts. It only switches between pairwise and sequential:
+    # commander, product and cardenc are never picked by size and have to be asked for by name.
+    if size <= PAIRWISE_LIMIT:
+        return "pairwise"
+    return "sequential"
+
+
+def exactly_one(pool, literals, encoding="auto"):
+    if encoding == "auto":
+        encoding = choose_encoding(len(literals))
+    if encoding not in AT_MOST_ONE:
+        raise ValueError(f"Unknown at-most-one encoding: {encoding}")
+
+    # At least one literal is true, and at most one of them
+    return [list(literals)] + AT_MOST_ONE[encoding](pool, literals)
@@ -1,35 +1,31 @@
-import requests
+import asyncio
 import sys
 import pathlib
-import json
-
-solpath = pathlib.Path(sys.argv[1])
 
+from verify import collect_solutions, verify_file
 
+solpath = pathlib.Path(sys.argv[1])
 
-def read(file):
-    with open(file) as fp:
-        return fp.read()
+if sys.argv[2:] == ['--remote']:
+    # The official verdict of the server, many requests at a time over keep-alive connections
+    from remote_verify import URL, CONCURRENCY, print_verdicts
+    solutions = collect_solutions([solpath])
+    correct = asyncio.run(print_verdicts(solutions, URL, CONCURRENCY))
+    print()
+    print(f'Correct: {correct}, Wrong: {len(solutions) - correct}')
+    sys.exit()
 
 correct = 0
 wrong = 0
 
-for solution_path in solpath.glob('*.solution'):
-
-    clues = read(pathlib.Path(__file__).parent / 'clues' / solution_path.name.replace('solution', 'clues'))
-    clue_lines = clues.splitlines()
-
-    data = {
-        'goal': 'check',
-        'clues': clues,
-        # solution file format is different on the server
-        'solution': 'anonymous problem\n' + clue_lines[0].split()[0] + '\n' + clue_lines[1] + '\n' + read(solution_path).replace('-', '0').replace('a', '1').replace('b', '2').replace('c', '3'),
-    }
-
-    response = requests.get(f'http://jfschaefer.de:8973/verify/ss23a31a/nonograms', data=json.dumps(data))
+# Checked locally against the .clues files, see verify.py (python verify.py DIR also checks in parallel)
+for solution_path in collect_solutions([solpath]):
+    _, mismatches = verify_file(solution_path)
     print(solution_path.name)
-    print('   ', response.text)
-    if response.text == 'Correct':
+    print('   ', 'Correct' if not mismatches else 'Wrong')
+    for mismatch in mismatches:
+        print('       ', mismatch)
+    if not mismatches:
         correct += 1
     else:
         wrong += 1
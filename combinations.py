@@ -1,42 +1,33 @@
 from sympy import symbols, Or, And, Not, Symbol
 from pysat.formula import CNF
 from pysat.solvers import Solver
-from itertools import combinations as itertools_combinations
-from itertools import count
+from functools import lru_cache
+from itertools import chain, combinations, count
+from math import comb
+import numpy as np
+from line_solver import EMPTY, count_placements, placements
+from main import Encoder, clause_solver, color_model_to_grid, fixed_cell_clauses, puzzle_lines, \
+    write_grid_to_file
+from hex_geometry import hex_geometry
+from puzzle import read_puzzle
+from propagation import color_bits, grid_size, initial_domains, known_cells, propagate
 
 FILENAME = "clues/trees-1.clues"
-colored = False
+ENUMERATION_LIMIT = 5000  # Lines with more placements than this are left to the automaton encoding
+VECTORIZE_LIMIT = 1 << 20  # placements × blocks × cells up to which a line is enumerated with NumPy in one step
+CACHED_MATRIX_CELLS = 1 << 14  # placements × cells up to which a placement matrix is shared between lines
+PLACEMENT_MATRICES = 512  # shared placement matrices kept, at most 8 MB together
+PROOF = False  # log a proof of unsatisfiability and print it (slows the solver, the proof can be huge)
 
 
 def get_content(filename):
-    with open(filename, 'r') as file:
-        # Read the entire content of the file
-        lines = file.readlines()
-
-        # Get the shape
-        first_line = lines[0].strip()
-        shape = first_line.split()
-
-        # Get the color
-        color = lines[1].strip().split()
-
-        # Get the hints
-        hints = []
-        for line in lines[2:]:
-            hint = line.strip()
-            hint_parts = hint.split()
-            hint_numbers = [int(part[:-1]) for part in hint_parts]  # Remove 'a' from the end
-            hint_colors = [part[-1] for part in hint_parts]  # Extract color ('a')
-            hints.append((hint_numbers, hint_colors))
+    puzzle = read_puzzle(filename)
+    shape, color, hints = puzzle.shape, puzzle.palette, puzzle.hints
 
     print(shape)
     print(color)
     print(hints)
 
-    global colored
-    if len(color) > 2:
-        colored = True
-
     return shape, color, hints
 
 
@@ -52,56 +43,108 @@ class Hex:
 
 
 def create_hex_board(edge_length):
-    board = {}
-    number = count(1)
-    for x in range(-edge_length, edge_length + 1):
-        for y in range(-edge_length, edge_length + 1):
-            z = -x - y
-            if -edge_length <= z <= edge_length and abs(x) + abs(y) + abs(z) <= 2 * edge_length - 1:
-                board[(x, y, z)] = next(number)
-    return board
-
-
-def generate_combinations(n, blocks, block_colors):
-    if not blocks:
-        return [[0] * n]
-
-    total_block_length = sum(blocks)
-    num_blocks = len(blocks)
-
-    minimum_required_spaces = 0
-    if colored:
-        for i in range(1, num_blocks):
-            if i > 0 and block_colors[i] == block_colors[i - 1]:
-                minimum_required_spaces += 1
-    elif not colored:
-        minimum_required_spaces = num_blocks - 1  # S
-
-    total_occupied_cells = total_block_length + minimum_required_spaces
-    remaining_cells = n - total_occupied_cells
-    gap_positions = num_blocks + 1
-
-    def distribute_cells(cells, gaps):
-        """Generate all distributions of cells into gaps."""
-        for positions in itertools_combinations(range(cells + gaps - 1), gaps - 1):
-            gaps_arr = [positions[0]] + [positions[i] - positions[i - 1] - 1 for i in range(1, len(positions))] + [
-                cells + gaps - 2 - positions[-1]]
-            yield gaps_arr
-
-    results = []
-    for gap_distribution in distribute_cells(remaining_cells, gap_positions):
-        row = []
-        previous_color = None
-
-        for i, (gap, block, color) in enumerate(zip(gap_distribution, blocks + [0], block_colors + [''])):
-            if i > 0 and previous_color == color:
-                row.extend([0])
-            row.extend([0] * gap)
-            row.extend([1] * block)
-            previous_color = color
-        results.append(row[:n])
-    print(results)
-    return results
+    # (x, y, z) -> variable id, shared with every other user of the same edge length
+    return hex_geometry(edge_length).cell_ids
+
+
+def earliest_starts(blocks, block_colors):
+    # The leftmost start of every block and the number of cells the blocks need when pushed together
+    earliest = []
+    position = 0
+    for i, block in enumerate(blocks):
+        earliest.append(position)
+        position += block
+        if i < len(blocks) - 1 and block_colors[i] == block_colors[i + 1]:
+            position += 1
+    return earliest, position
+
+
+def placement_matrix(n, blocks, block_colors):
+    """
+    Every placement of the blocks in a line of n cells, built in one vectorized step. blocks and block_colors have to
+    be tuples. Matrices of up to CACHED_MATRIX_CELLS cells are shared between lines with the same length and hints,
+    larger ones are built for each line so the cache stays small.
+
+    A placement is a choice of k gap positions out of slack + k, where the slack is the number of cells the blocks can
+    be pushed to the right: the i-th chosen position minus i is how far block i is pushed. All choices are read into
+    one array, turned into start and end columns, and compared with the cell indexes at once.
+
+    Returns:
+    - A read-only uint8 matrix with one row per placement and one column per cell (1 filled, 0 empty), or None if
+      the intermediate arrays would have more than VECTORIZE_LIMIT entries.
+    """
+    slack = n - earliest_starts(blocks, block_colors)[1]
+    if slack < 0 or comb(slack + len(blocks), len(blocks)) * n <= CACHED_MATRIX_CELLS:
+        return cached_placement_matrix(n, blocks, block_colors)
+    return build_placement_matrix(n, blocks, block_colors)
+
+
+def build_placement_matrix(n, blocks, block_colors):
+    k = len(blocks)
+    earliest, position = earliest_starts(blocks, block_colors)
+    slack = n - position
+    if slack < 0:
+        matrix = np.zeros((0, n), dtype=np.uint8)
+    elif k == 0:
+        matrix = np.zeros((1, n), dtype=np.uint8)
+    else:
+        num_placements = comb(slack + k, k)
+        if num_placements * k * n > VECTORIZE_LIMIT:
+            return None
+        picks = np.fromiter(chain.from_iterable(combinations(range(slack + k), k)), dtype=np.intp,
+                            count=num_placements * k).reshape(num_placements, k)
+        starts = picks - np.arange(k) + np.array(earliest)
+        ends = starts + np.array(blocks)
+        cells = np.arange(n)
+        matrix = ((cells >= starts[:, :, None]) & (cells < ends[:, :, None])).any(axis=1).astype(np.uint8)
+    # Possibly shared between lines, nobody may change it
+    matrix.setflags(write=False)
+    return matrix
+
+
+cached_placement_matrix = lru_cache(maxsize=PLACEMENT_MATRICES)(build_placement_matrix)
+
+
+def generate_combinations(n, blocks, block_colors, known=None):
+    # All placements of the blocks that agree with the known cells (1 filled, 0 empty, None open), as a uint8 matrix
+    # with one row per placement. Short lines are enumerated with placement_matrix and filtered afterwards, longer ones
+    # are walked with the dynamic program of line_solver, so inconsistent placements are never built.
+    matrix = placement_matrix(n, tuple(blocks), tuple(block_colors))
+    if matrix is not None:
+        if known is not None:
+            known = np.array([-1 if cell is None else cell for cell in known])
+            decided = known >= 0
+            matrix = matrix[(matrix[:, decided] == known[decided]).all(axis=1)]
+        return matrix
+
+    bits = {color: 1 << (i + 1) for i, color in enumerate(sorted(set(block_colors)))}
+    filled = sum(bits.values())
+    if known is None:
+        known = [None] * n
+    domains = [EMPTY if cell == 0 else filled if cell == 1 else EMPTY | filled for cell in known]
+
+    results = [[0 if state == EMPTY else 1 for state in row]
+               for row in placements(domains, blocks, [bits[color] for color in block_colors])]
+    return np.array(results, dtype=np.uint8).reshape(len(results), n)
+
+
+def line_dnf(var_symbols, matrix):
+    # The placements of one line as a formula. Cells every placement agrees on (a column of the matrix that is all 1
+    # or all 0) become plain literals, only the other cells are left to the DNF and its Tseytin helpers.
+    if len(matrix) == 0:
+        # The line has no placement at all. SymPy would turn an empty Or into false, which sympy_to_cnf cannot write
+        # as clauses, so the contradiction is spelled out on the first cell instead: two unit clauses x and ~x.
+        return And(var_symbols[0], Not(var_symbols[0]))
+    always = matrix.all(axis=0)
+    never = ~matrix.any(axis=0)
+    fixed = [var if always[j] else Not(var) for j, var in enumerate(var_symbols) if always[j] or never[j]]
+    open_cells = np.flatnonzero(~(always | never))
+    if len(open_cells) == 0:
+        return And(*fixed)
+
+    clause_terms = [And(*(var_symbols[j] if sign else Not(var_symbols[j]) for j, sign in zip(open_cells, row)))
+                    for row in matrix[:, open_cells]]
+    return And(*fixed, dnf_to_cnf(Or(*clause_terms)))
 
 
 counter = count(start=1)  # Helper variable counter
@@ -186,7 +229,7 @@ def dnf_to_cnf(dnf_formula):
 run_counter = 0
 
 
-def generate_dnf(shape, hints):
+def generate_dnf(shape, hints, known=None):
     # Create variable names dynamically
     variables = []
 
@@ -200,63 +243,28 @@ def generate_dnf(shape, hints):
             is_row = True if is_row == "row" else False
 
             if is_row:
-                all_signs = generate_combinations(n, hint_numbers, hint_colors)
-                var_symbols = [symbols(f'x{index}{j}') for j in range(n)]
+                line_known = None if known is None else [known[index * n + j] for j in range(n)]
+                all_signs = generate_combinations(n, hint_numbers, hint_colors, line_known)
+                var_symbols = [symbols(f'x{index}_{j}') for j in range(n)]
             else:
-                all_signs = generate_combinations(m, hint_numbers, hint_colors)
-                var_symbols = [symbols(f'x{j}{index}') for j in range(m)]
+                line_known = None if known is None else [known[j * n + index] for j in range(m)]
+                all_signs = generate_combinations(m, hint_numbers, hint_colors, line_known)
+                var_symbols = [symbols(f'x{j}_{index}') for j in range(m)]
 
             variables.append(var_symbols)
-            clause_terms = []
-            for signs in all_signs:
-                terms = []
-                for j, sign in enumerate(signs):
-                    var = variables[index][j] if is_row else variables[j][index]
-                    if sign == 1:
-                        terms.append(var)
-                    elif sign == 0:
-                        terms.append(Not(var))
-                clause_terms.append(And(*terms))
         else:
-            coordinates = []
-            var_symbols = []
-            for (x, y, z) in var_map.values():
-                if is_row == "x":
-                    if x == index:
-                        coordinates.append((x, y, z))
-                        var_symbols.append(Symbol(f'x{x}_{y}_{z}'))
-                elif is_row == "y":
-                    if y == index:
-                        coordinates.append((x, y, z))
-                        var_symbols.append(Symbol(f'x{x}_{y}_{z}'))
-                    q = []
-                    q.extend(hint_numbers)
-                    hint_numbers = q[::-1]
-
-                elif is_row == "z":
-                    if z == index:
-                        coordinates.append((x, y, z))
-                        var_symbols.append(Symbol(f'x{x}_{y}_{z}'))
+            coordinates = hex_geometry(e).hint_line(is_row, index)
+            var_symbols = [Symbol(f'x{x}_{y}_{z}') for x, y, z in coordinates]
 
             # print("coordinates", coordinates)
             # print("var_symbols", var_symbols)
 
             line_length = len(coordinates)
+            line_known = None if known is None else [known[board[coordinate] - 1] for coordinate in coordinates]
 
-            all_signs = generate_combinations(line_length, hint_numbers, hint_colors)  # Updated to hex logic
-            clause_terms = []
-
-            for signs in all_signs:
-                terms = []
-                for j, sign in enumerate(signs):
-                    var = var_symbols[j]
-                    if sign == 1:
-                        terms.append(var)
-                    elif sign == 0:
-                        terms.append(Not(var))
-                clause_terms.append(And(*terms))
-        # print(hint_numbers, clause_terms)
-        return dnf_to_cnf(Or(*clause_terms))
+            # Updated to hex logic
+            all_signs = generate_combinations(line_length, hint_numbers, hint_colors, line_known)
+        return line_dnf(var_symbols, all_signs)
 
     if shape[0] == "rect":
         m = int(shape[1])  # Number of rows
@@ -279,7 +287,6 @@ def generate_dnf(shape, hints):
     elif shape[0] == "hex":
         e = int(shape[1])
         board = create_hex_board(e)
-        var_map = {f'x{x}_{y}_{z}': (x, y, z) for x, y, z in board.keys()}
 
         hint_length = e + e - 1
         x_hints = hints[:hint_length]
@@ -318,7 +325,7 @@ def sympy_to_cnf(shape, sympy_expr):
 
         for i in range(rows):
             for j in range(cols):
-                var_name = f'x{i}{j}'
+                var_name = f'x{i}_{j}'
                 variable_map[var_name] = index
                 rev_variable_map[index] = var_name
                 index += 1
@@ -399,7 +406,7 @@ def sat_solver(shape, sympy_expr):
     cnf = CNF(from_clauses=cnf_clauses)
 
     # create a SAT solver for this formula:
-    with Solver(name='Glucose42', with_proof=True) as solver:
+    with Solver(name='Glucose42', with_proof=PROOF) as solver:
         solver.append_formula(cnf)
         is_satisfiable = solver.solve()
         print(solver.accum_stats())
@@ -409,8 +416,8 @@ def sat_solver(shape, sympy_expr):
             return model
         else:
             print("Unsatisfiable")
-            print("Proof", solver.get_proof())
-            print('and the unsatisfiable core is:', solver.get_core())
+            if PROOF:
+                print("Proof", solver.get_proof())
 
 
 def write_model_to_file(model, shape, hints, filename):
@@ -454,30 +461,13 @@ def write_model_to_file(model, shape, hints, filename):
                 else:
                     grid[row][col] = '-'
     else:
-        # Generate the hexagonal board (the dictionary containing (x, y, z) as keys)
-        board = create_hex_board(int(shape[1]))
-
-        # Extract hex coordinates from the board
-        hex_coords = list(board.keys())
-
-        # Determine unique z levels
-        x_levels = sorted(set(x for _, _, x in hex_coords))
+        # Rows follow the x levels, the geometry knows the row and column of every cell
+        geometry = hex_geometry(int(shape[1]))
 
-        # Create a dictionary to map z levels to their respective rows in the result grid
-        row_mapping = {x: [] for x in x_levels}
+        # Initialize the result grid based on x levels
+        result_grid = geometry.empty_grid()
 
-        # Populate the row_mapping with coordinates for each z level
-        for coord in hex_coords:
-            x, y, z = coord
-            row_mapping[x].append((x, y, z))
-
-        # Initialize the result grid based on z levels
-        result_grid = [['-' for _ in range(len(row_mapping[x]))] for x in x_levels]
-
-        # Flattened grid for easier indexing
-        flattened_grid = hex_coords
-
-        num_grid_vars = len(flattened_grid)
+        num_grid_vars = len(geometry.cells)
 
         # Initialize pointers for block lengths and colors
         block_index = 0
@@ -487,11 +477,9 @@ def write_model_to_file(model, shape, hints, filename):
         for value in model:
             if abs(value) <= num_grid_vars:  # Only consider grid variables
                 index = abs(value) - 1  # Convert to 0-based index
-                x, y, z = flattened_grid[index]  # Retrieve coordinates from the flattened grid
 
                 # Find the correct row and column in the result grid
-                row_idx = x_levels.index(x)  # Row index based on z level
-                col_idx = row_mapping[x].index((x, y, z))  # Column index within the row
+                row_idx, col_idx = geometry.positions[index]
 
                 # Determine color based on block_lengths and colors
                 if value > 0 and block_index < len(block_lengths):
@@ -515,7 +503,27 @@ def write_model_to_file(model, shape, hints, filename):
 
 def main():
     shape, color, hints = get_content(FILENAME)
-    cnf_formula = generate_dnf(shape, hints)
+
+    # Fix what line logic can fix, then count the placements that are left without enumerating them
+    lines = puzzle_lines(shape, hints)
+    bits = color_bits(lines)
+    domains = propagate(lines, initial_domains(grid_size(lines), bits), bits)
+    if domains is None:
+        print("Unsatisfiable")
+        return
+    largest = max(count_placements([domains[cell] for cell in cells], hint_numbers, [bits[c] for c in hint_colors])
+                  for _, _, cells, hint_numbers, hint_colors in lines)
+
+    if largest > ENUMERATION_LIMIT:
+        print(f"A line has {largest} placements, using the automaton encoding instead")
+        # Still an exact constraint per line, but its size does not depend on the number of placements
+        model = clause_solver(Encoder(shape, hints, line_encoding="automaton").encode() + fixed_cell_clauses(domains))
+        if model:
+            # The automaton model knows the color of every cell
+            write_grid_to_file(color_model_to_grid(model, shape, hints), FILENAME)
+        return
+
+    cnf_formula = generate_dnf(shape, hints, known_cells(domains))
     # cnf_formula = dnf_to_cnf(dnf_formulas)
     model = sat_solver(shape, cnf_formula)
     if model:
@@ -0,0 +1,118 @@
+# Brute force helpers shared by the tests. Every grid of a tiny board is tried, so the solvers can be compared with
+# the plain definition of the hints: a line matches its hints if its runs of equally colored cells are the blocks.
+import random
+from functools import lru_cache
+from itertools import product
+
+from hex_geometry import AXES, hex_geometry
+
+# Tiny boards with the colors their grids may use, small enough to try every grid
+BOARDS = [
+    (('rect', '2', '3'), 'a'),
+    (('rect', '3', '3'), 'a'),
+    (('rect', '2', '3'), 'ab'),
+    (('rect', '3', '3'), 'ab'),
+    (('hex', '2'), 'a'),
+    (('hex', '2'), 'ab'),
+]
+
+
+def line_hints(cells):
+    # (block lengths, block colors) of a line of color letters, '-' for empty cells
+    numbers, colors = [], []
+    previous = '-'
+    for cell in cells:
+        if cell != '-':
+            if cell == previous:
+                numbers[-1] += 1
+            else:
+                numbers.append(1)
+                colors.append(cell)
+        previous = cell
+    return numbers, colors
+
+
+def board_lines(shape):
+    # The 0-based cells of every line in the order of the hints: rows then columns, or the x, y and z lines
+    if shape[0] == 'rect':
+        rows, cols = int(shape[1]), int(shape[2])
+        return ([[row * cols + col for col in range(cols)] for row in range(rows)]
+                + [[row * cols + col for row in range(rows)] for col in range(cols)])
+    geometry = hex_geometry(int(shape[1]))
+    return [cells for axis in AXES for cells in geometry.hint_cells[axis]]
+
+
+def num_cells(shape):
+    if shape[0] == 'rect':
+        return int(shape[1]) * int(shape[2])
+    return len(hex_geometry(int(shape[1])).cells)
+
+
+def hints_of(shape, grid):
+    # The hints of a grid, which holds the letter of every cell in variable order
+    return [line_hints([grid[cell] for cell in cells]) for cells in board_lines(shape)]
+
+
+def hints_key(hints):
+    return tuple((tuple(numbers), tuple(colors)) for numbers, colors in hints)
+
+
+@lru_cache(maxsize=None)
+def grids_by_hints(shape, colors):
+    # Every grid of the board, grouped by its hints
+    grids = {}
+    for grid in product('-' + colors, repeat=num_cells(shape)):
+        grids.setdefault(hints_key(hints_of(shape, grid)), []).append(grid)
+    return grids
+
+
+def solutions(shape, colors, hints):
+    return grids_by_hints(tuple(shape), colors).get(hints_key(hints), [])
+
+
+def count_solutions(shape, colors, hints):
+    return len(solutions(shape, colors, hints))
+
+
+def grid_rows(shape, grid):
+    # The grid as the rows of a solution file
+    if shape[0] == 'rect':
+        cols = int(shape[2])
+        return ["".join(grid[i:i + cols]) for i in range(0, len(grid), cols)]
+    geometry = hex_geometry(int(shape[1]))
+    rows = geometry.empty_grid()
+    for cell, (row, col) in enumerate(geometry.positions):
+        rows[row][col] = grid[cell]
+    return ["".join(row) for row in rows]
+
+
+def clues_text(shape, colors, hints):
+    palette = ['#ffffff', '#000000', '#ff0000'][:len(colors) + 1]
+    lines = [" ".join(shape), " ".join(palette)]
+    lines += [" ".join(f"{n}{c}" for n, c in zip(numbers, hint_colors)) for numbers, hint_colors in hints]
+    return "\n".join(lines) + "\n"
+
+
+def random_hints(rng, shape, colors):
+    # Hints of random blocks, often without any solution and sometimes longer than their line
+    hints = []
+    for cells in board_lines(shape):
+        num_blocks = rng.randint(0, (len(cells) + 1) // 2)
+        hints.append(([rng.randint(1, len(cells) + 1) for _ in range(num_blocks)],
+                      [rng.choice(colors) for _ in range(num_blocks)]))
+    return hints
+
+
+def random_puzzles(seed, count):
+    # (shape, colors, hints) of tiny puzzles: half of them the hints of a random grid, half random hints
+    rng = random.Random(seed)
+    puzzles = []
+    for i in range(count):
+        shape, colors = rng.choice(BOARDS)
+        if i % 2:
+            hints = random_hints(rng, shape, colors)
+        else:
+            grid = [rng.choice('--' + colors) for _ in range(num_cells(shape))]
+            hints = hints_of(shape, grid)
+        puzzles.append((list(shape), colors, hints))
+    return puzzles
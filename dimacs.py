@@ -0,0 +1,133 @@
+import argparse
+import mmap
+import os
+import shutil
+import tempfile
+
+from pysat.solvers import Solver
+
+from main import Encoder, color_model_to_grid, write_grid_to_file
+from puzzle import read_puzzle
+
+
+class DimacsWriter:
+    # Writes clauses to a DIMACS file as they come, without keeping them in memory. The header needs the number of
+    # variables and clauses, so the clauses go to a temporary file next to the target first and are copied behind the
+    # header on close.
+    def __init__(self, path):
+        self.path = path
+        self.num_variables = 0
+        self.num_clauses = 0
+        self.body = tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp",
+                                                delete=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.body.close()
+            os.remove(self.body.name)
+
+    def __len__(self):
+        return self.num_clauses
+
+    def append(self, clause):
+        self.body.write(" ".join(map(str, clause)) + " 0\n")
+        self.num_clauses += 1
+        if clause:
+            self.num_variables = max(self.num_variables, max(map(abs, clause)))
+
+    def extend(self, clauses):
+        for clause in clauses:
+            self.append(clause)
+
+    def close(self):
+        self.body.close()
+        with open(self.path, "w") as file:
+            file.write(f"p cnf {self.num_variables} {self.num_clauses}\n")
+            with open(self.body.name) as body:
+                shutil.copyfileobj(body, file)
+        os.remove(self.body.name)
+
+
+def write_dimacs(shape, hints, path):
+    # Encode a puzzle with the block start rules straight into a DIMACS file, returns (variables, clauses)
+    with DimacsWriter(path) as writer:
+        Encoder(shape, hints, clauses=writer).encode()
+    return writer.num_variables, writer.num_clauses
+
+
+def iter_dimacs(path):
+    """
+    Read the clauses of a DIMACS file one at a time.
+
+    The file is memory-mapped, so only the clause being read is held in memory. Comment lines and the header are
+    skipped; a clause may span several lines and ends with 0. A line starting with % ends the clauses, as in the
+    SATLIB files, where it is followed by a lone 0 that is not an empty clause.
+
+    Returns:
+    - A generator of clauses (lists of integers).
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            clause = []
+            for line in iter(data.readline, b""):
+                if line[:1] == b"%":
+                    break
+                if line[:1] in (b"c", b"p"):
+                    continue
+                for token in line.split():
+                    literal = int(token)
+                    if literal:
+                        clause.append(literal)
+                    else:
+                        yield clause
+                        clause = []
+            if clause:
+                yield clause
+
+
+def load_dimacs(path, solver):
+    # Add the clauses of a DIMACS file to a PySAT solver one at a time, returns the number of clauses
+    count = 0
+    for clause in iter_dimacs(path):
+        solver.add_clause(clause)
+        count += 1
+    return count
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Write puzzles as DIMACS files and solve DIMACS files.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='encode a .clues file into a DIMACS file')
+    export.add_argument('clues')
+    export.add_argument('cnf')
+    solve = commands.add_parser('solve', help='solve a DIMACS file')
+    solve.add_argument('cnf')
+    solve.add_argument('--clues', default=None, help='the puzzle the file was made from, to write its solution')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        puzzle = read_puzzle(args.clues)
+        num_variables, num_clauses = write_dimacs(puzzle.shape, puzzle.hints, args.cnf)
+        print(f'Wrote {num_clauses} clauses over {num_variables} variables to {args.cnf}')
+        return
+
+    with Solver(name='minisat22') as solver:
+        load_dimacs(args.cnf, solver)
+        if not solver.solve():
+            print("Unsatisfiable")
+            return
+        print("Satisfiable")
+        if args.clues:
+            puzzle = read_puzzle(args.clues)
+            write_grid_to_file(color_model_to_grid(solver.get_model(), puzzle.shape, puzzle.hints), args.clues)
+
+
+if __name__ == '__main__':
+    main_cli()
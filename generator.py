@@ -0,0 +1,229 @@
+import argparse
+import os
+import pathlib
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from hex_geometry import AXES, hex_geometry
+from incremental import IncrementalSolver
+from puzzle import parse_puzzle
+
+try:
+    from PIL import Image
+except ImportError:
+    # Without Pillow only netpbm images (.pgm, .ppm) can be read
+    Image = None
+
+BACKGROUND = "#ffffff"
+COLORS = ["#000000", "#ff0000", "#00aa00", "#0000ff", "#ffaa00", "#aa00aa", "#00aaaa"]
+DENSITY = 0.6  # share of filled cells in random puzzles, denser boards are unique more often
+BATCH = 16  # candidates per task, so the workers don't wait on the pool for every single one
+
+
+def board_cells(kind, dimensions):
+    # Number of cells in variable order, the same order as the solvers use
+    if kind == "rect":
+        return dimensions[0] * dimensions[1]
+    return len(hex_geometry(dimensions[0]).cells)
+
+
+def board_lines(kind, dimensions):
+    # The cells (0-based, in board order) of every hint line, in the order the .clues file lists the hints
+    if kind == "rect":
+        rows, cols = dimensions
+        return ([[row * cols + col for col in range(cols)] for row in range(rows)]
+                + [[row * cols + col for row in range(rows)] for col in range(cols)])
+    return [cells for axis in AXES for cells in hex_geometry(dimensions[0]).hint_cells[axis]]
+
+
+def line_hints(cells):
+    # Run-length encoding of one line: every maximal run of the same letter is a block
+    hints = []
+    previous = '-'
+    for cell in cells:
+        if cell != '-':
+            if cell == previous:
+                hints[-1][0] += 1
+            else:
+                hints.append([1, cell])
+        previous = cell
+    return " ".join(f"{length}{color}" for length, color in hints)
+
+
+def clues_text(kind, dimensions, palette, cells):
+    # The .clues file of a solution, cells holds the letter ('-' for empty) of every cell in variable order
+    lines = [f"{kind} {' '.join(map(str, dimensions))}", " ".join(palette)]
+    lines.extend(line_hints([cells[cell] for cell in line]) for line in board_lines(kind, dimensions))
+    return "\n".join(lines) + "\n"
+
+
+def random_cells(kind, dimensions, num_colors, density, rng):
+    letters = [chr(ord('a') + i) for i in range(num_colors)]
+    return [rng.choice(letters) if rng.random() < density else '-' for _ in range(board_cells(kind, dimensions))]
+
+
+def random_palette(num_colors, rng):
+    return [BACKGROUND, *rng.sample(COLORS, num_colors)]
+
+
+def is_unique(text):
+    puzzle, _ = parse_puzzle(iter(text.splitlines()))
+    with IncrementalSolver(puzzle.shape, puzzle.hints) as solver:
+        return solver.is_unique()
+
+
+def generate_batch(kind, dimensions, num_colors, density, seed, size):
+    # Runs in a worker process: size random candidates, returns the texts of the uniquely solvable ones
+    rng = random.Random(seed)
+    unique = []
+    for _ in range(size):
+        text = clues_text(kind, dimensions, random_palette(num_colors, rng),
+                          random_cells(kind, dimensions, num_colors, density, rng))
+        if is_unique(text):
+            unique.append(text)
+    return size, unique
+
+
+def read_image(path):
+    # (width, height, rows of (r, g, b) pixels)
+    if Image is not None:
+        image = Image.open(path).convert("RGB")
+        pixels = list(image.getdata())
+        return image.width, image.height, [pixels[i:i + image.width] for i in range(0, len(pixels), image.width)]
+    return read_netpbm(path)
+
+
+def read_netpbm(path):
+    # Plain or binary gray (P2, P5) and color (P3, P6) netpbm images with 8 bit samples
+    data = pathlib.Path(path).read_bytes()
+    fields = []
+    position = 0
+    while len(fields) < 4:
+        while data[position:position + 1].isspace():
+            position += 1
+        if data[position:position + 1] == b"#":
+            position = data.index(b"\n", position)
+            continue
+        end = position
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[position:end].decode())
+        position = end
+    magic, width, height, maximum = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic not in ("P2", "P3", "P5", "P6") or maximum > 255:
+        raise ValueError(f"{path}: only 8 bit P2, P3, P5 and P6 images can be read without Pillow")
+
+    channels = 3 if magic in ("P3", "P6") else 1
+    if magic in ("P5", "P6"):
+        samples = list(data[position + 1:position + 1 + width * height * channels])
+    else:
+        samples = [int(sample) for sample in data[position:].split()]
+    scale = 255 / maximum
+    pixels = [tuple(round(sample * scale) for sample in (samples[i:i + 3] if channels == 3 else [samples[i]] * 3))
+              for i in range(0, width * height * channels, channels)]
+    return width, height, [pixels[i:i + width] for i in range(0, len(pixels), width)]
+
+
+def sample_points(kind, dimensions, width, height):
+    # The pixel every cell takes its color from, in variable order
+    if kind == "rect":
+        rows, cols = dimensions
+        return [(int((col + 0.5) * width / cols), int((row + 0.5) * height / rows))
+                for row in range(rows) for col in range(cols)]
+    centers = hex_geometry(dimensions[0]).centers(1)
+    if len(centers) == 1:
+        # A board of one cell has no extent to scale to, it takes the center of the picture
+        return [(width // 2, height // 2)]
+    left, right = min(x for x, _ in centers), max(x for x, _ in centers)
+    top, bottom = min(y for _, y in centers), max(y for _, y in centers)
+    return [(min(width - 1, int((x - left) / (right - left) * (width - 1))),
+             min(height - 1, int((y - top) / (bottom - top) * (height - 1)))) for x, y in centers]
+
+
+def image_cells(path, kind, dimensions, num_colors):
+    """
+    Turn a picture into a puzzle solution.
+
+    Every cell takes the color of the pixel under its center. The most common color is the background, the next
+    num_colors most common ones (after rounding away small differences) become the colors of the puzzle, and every
+    other pixel goes to the closest of these.
+
+    Returns:
+    - The palette and the letter of every cell in variable order.
+    """
+    width, height, pixels = read_image(path)
+    samples = [pixels[y][x] for x, y in sample_points(kind, dimensions, width, height)]
+
+    # Pixels that only differ a little are counted together, the first of them stands for the whole group
+    counts = {}
+    representative = {}
+    for pixel in samples:
+        rounded = tuple(channel >> 5 for channel in pixel)
+        counts[rounded] = counts.get(rounded, 0) + 1
+        representative.setdefault(rounded, pixel)
+    chosen = [representative[rounded] for rounded in sorted(counts, key=counts.get, reverse=True)[:num_colors + 1]]
+
+    def closest(pixel):
+        return min(range(len(chosen)), key=lambda i: sum((a - b) ** 2 for a, b in zip(pixel, chosen[i])))
+
+    cells = ['-' if index == 0 else chr(ord('a') + index - 1) for index in map(closest, samples)]
+    palette = ["#" + "".join(f"{channel:02x}" for channel in color) for color in chosen]
+    return palette, cells
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Generate uniquely solvable nonograms.')
+    parser.add_argument('output', help='directory for the .clues files')
+    parser.add_argument('--kind', choices=['rect', 'hex'], default='rect')
+    parser.add_argument('--size', type=int, nargs='+', default=[10, 10], help='rows and columns, or the edge length')
+    parser.add_argument('--colors', type=int, default=1, help='number of colors besides the background')
+    parser.add_argument('--count', type=int, default=10, help='number of unique puzzles to generate')
+    parser.add_argument('--density', type=float, default=DENSITY, help='share of filled cells')
+    parser.add_argument('--image', default=None, help='derive one puzzle from this picture instead')
+    parser.add_argument('--prefix', default='random', help='file names are PREFIX-001.clues, PREFIX-002.clues, ...')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible corpora')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    args = parser.parse_args()
+
+    dimensions = tuple(args.size[:2] if args.kind == "rect" else args.size[:1])
+    output = pathlib.Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    if args.image:
+        palette, cells = image_cells(args.image, args.kind, dimensions, args.colors)
+        text = clues_text(args.kind, dimensions, palette, cells)
+        path = output / f'{args.prefix}.clues'
+        path.write_text(text)
+        print(f'Wrote {path}, {"the solution is unique" if is_unique(text) else "the solution is NOT unique"}')
+        return
+
+    rng = random.Random(args.seed)
+    found = []
+    candidates = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Results are taken in the order the batches were submitted, not in the order they finish, so the seeded
+        # sequence of batches decides the output and the number of workers only the speed
+        pending = deque()
+        while len(found) < args.count:
+            # Keep every worker busy until enough unique puzzles came back
+            while len(pending) < 2 * args.workers:
+                pending.append(executor.submit(generate_batch, args.kind, dimensions, args.colors, args.density,
+                                               rng.getrandbits(64), BATCH))
+            tried, unique = pending.popleft().result()
+            candidates += tried
+            found.extend(unique)
+        for future in pending:
+            future.cancel()
+
+    for number, text in enumerate(found[:args.count], 1):
+        (output / f'{args.prefix}-{number:03}.clues').write_text(text)
+    elapsed = time.perf_counter() - started
+    print(f'Generated {args.count} unique puzzles out of {candidates} candidates in {elapsed:.2f} seconds '
+          f'({args.count / elapsed:.1f} puzzles/s, {candidates / elapsed:.1f} candidates/s)')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,90 @@
+import math
+from functools import lru_cache
+
+AXES = ["x", "y", "z"]
+# Axes whose hints are given in the opposite direction of the board order
+REVERSED_AXES = {"y"}
+
+
+class HexGeometry:
+    # Everything about a hex board that only depends on its edge length, computed once per edge length.
+    #
+    # cells: cube coordinates in variable order, the cell at index i is variable i + 1
+    # cell_ids: cube coordinates -> variable id
+    # lines: for every axis, the coordinates of line i (axis value i - edge + 1) in board order
+    # line_cells: the same lines as 0-based cell indexes
+    # hint_lines, hint_cells: the same again, in the direction the hints of the .clues file read them. The y hints run
+    #     against the board order, so their lines are reversed here once and every user of hint_lines, hint_line or
+    #     hint_cells can match the cells with the hints position by position without reversing anything itself.
+    # positions: (row, column) of every cell in the solution file, rows follow the x levels
+    # row_lengths: number of cells in every row of the solution file
+    __slots__ = ("edge", "cells", "cell_ids", "lines", "line_cells", "hint_lines", "hint_cells", "positions",
+                 "row_lengths", "row_starts")
+
+    def __init__(self, edge):
+        self.edge = edge
+        radius = edge - 1
+        # Every x level is one row, its y values run from first_y(x) to last_y(x)
+        self.cells = [(x, y, -x - y) for x in range(-radius, radius + 1)
+                      for y in range(self.first_y(x), self.last_y(x) + 1)]
+        self.cell_ids = {coordinates: i + 1 for i, coordinates in enumerate(self.cells)}
+        self.row_lengths = [self.last_y(x) - self.first_y(x) + 1 for x in range(-radius, radius + 1)]
+        self.row_starts = [0]
+        for length in self.row_lengths[:-1]:
+            self.row_starts.append(self.row_starts[-1] + length)
+
+        self.lines = {axis: [self.line_coordinates(axis, value) for value in range(-radius, radius + 1)]
+                      for axis in AXES}
+        self.line_cells = {axis: [[self.cell_index(coordinates) for coordinates in line] for line in lines]
+                           for axis, lines in self.lines.items()}
+        # The only place the direction of the y hints is dealt with
+        self.hint_lines = {axis: [line[::-1] for line in lines] if axis in REVERSED_AXES else lines
+                           for axis, lines in self.lines.items()}
+        self.hint_cells = {axis: [line[::-1] for line in lines] if axis in REVERSED_AXES else lines
+                           for axis, lines in self.line_cells.items()}
+
+        self.positions = [None] * len(self.cells)
+        for row, line in enumerate(self.line_cells["x"]):
+            for col, cell in enumerate(line):
+                self.positions[cell] = (row, col)
+
+    def first_y(self, x):
+        return max(-self.edge + 1, -self.edge + 1 - x)
+
+    def last_y(self, x):
+        return min(self.edge - 1, self.edge - 1 - x)
+
+    def cell_index(self, coordinates):
+        # 0-based variable order of a cell, from its row start without a lookup
+        x, y, _ = coordinates
+        return self.row_starts[x + self.edge - 1] + y - self.first_y(x)
+
+    def line_coordinates(self, axis, value):
+        # The cells where the axis coordinate equals value in board order, generated straight from the cube
+        # coordinates in O(line length). The other two coordinates of a line have the same range as y in row x.
+        if axis == "x":
+            return [(value, y, -value - y) for y in range(self.first_y(value), self.last_y(value) + 1)]
+        if axis == "y":
+            return [(x, value, -x - value) for x in range(self.first_y(value), self.last_y(value) + 1)]
+        return [(x, -x - value, value) for x in range(self.first_y(value), self.last_y(value) + 1)]
+
+    def line(self, axis, index):
+        # Coordinates of the line where the axis coordinate equals index
+        return self.lines[axis][index + self.edge - 1]
+
+    def hint_line(self, axis, index):
+        # The same line in the direction its hints are given
+        return self.hint_lines[axis][index + self.edge - 1]
+
+    def empty_grid(self):
+        return [['-'] * length for length in self.row_lengths]
+
+    def centers(self, size):
+        # Center of every cell in a drawing of pointy-top hexagons with the given radius, every x level is one row
+        width = math.sqrt(3) * size
+        return [(width * (y + x / 2), 1.5 * size * x) for x, y, _ in self.cells]
+
+
+@lru_cache(maxsize=None)
+def hex_geometry(edge):
+    return HexGeometry(edge)
@@ -0,0 +1,115 @@
+import argparse
+
+from pysat.solvers import Solver
+
+from batch import collect_puzzles
+from main import Encoder, color_model_to_grid, fixed_cell_clauses
+from propagation import color_bits, initial_domains, propagate
+from puzzle import read_puzzle
+
+
+class IncrementalSolver:
+    """
+    One SAT solver that stays alive for a puzzle, so it can be asked many questions without rebuilding the CNF.
+
+    The clauses come from Encoder. Cells can be fixed for a single call with assumptions, and solutions are told
+    apart by blocking clauses over the grid variables (the color variables of colored puzzles, the cells of
+    monochrome ones). The blocking clauses of an enumeration are guarded by a fresh selector variable that is only
+    assumed during that enumeration and switched off afterwards, so every call starts from the original puzzle.
+
+    With propagate_lines, the cells line propagation can fix are added as unit clauses first. They hold in every
+    solution, so counting stays exact, but the solver has far less to search.
+    """
+
+    def __init__(self, shape, hints, solver_name='minisat22', propagate_lines=True):
+        self.shape = shape
+        self.hints = hints
+        self.encoder = Encoder(shape, hints)
+        self.solver = Solver(name=solver_name, bootstrap_with=self.encoder.encode())
+        if propagate_lines:
+            bits = color_bits(self.encoder.lines)
+            domains = propagate(self.encoder.lines, initial_domains(self.encoder.num_cells, bits), bits)
+            if domains is None:
+                # No solution at all
+                self.solver.add_clause([1])
+                self.solver.add_clause([-1])
+            else:
+                self.solver.append_formula(fixed_cell_clauses(domains))
+        num_cells = self.encoder.num_cells
+        if self.encoder.colors:
+            self.grid_variables = range(num_cells + 1, num_cells * (len(self.encoder.colors) + 1) + 1)
+        else:
+            self.grid_variables = range(1, num_cells + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.solver.delete()
+
+    def cell_literal(self, cell, color=None):
+        # Assumption that the 0-based cell is empty (color None) or has the color
+        if color is None:
+            return -(cell + 1)
+        return self.encoder.filled_with(cell + 1, color)
+
+    def solve(self, assumptions=()):
+        # A model under the assumptions, None if there is none
+        if self.solver.solve(assumptions=list(assumptions)):
+            return self.solver.get_model()
+        return None
+
+    def models(self, limit=None, assumptions=()):
+        # Up to limit models that differ in at least one cell, one SAT call each
+        selector = self.encoder.pool.id()
+        found = 0
+        try:
+            while limit is None or found < limit:
+                model = self.solve([*assumptions, selector])
+                if model is None:
+                    return
+                yield model
+                found += 1
+                # The next model has to differ from this one somewhere on the grid
+                self.solver.add_clause([-selector, *(-model[v - 1] for v in self.grid_variables)])
+        finally:
+            # Switch the blocking clauses of this enumeration off for good
+            self.solver.add_clause([-selector])
+
+    def solutions(self, limit=None, assumptions=()):
+        # The same as models, decoded into solution grids
+        for model in self.models(limit, assumptions):
+            yield color_model_to_grid(model, self.shape, self.hints)
+
+    def count_solutions(self, limit=None, assumptions=()):
+        return sum(1 for _ in self.models(limit, assumptions))
+
+    def is_unique(self, assumptions=()):
+        # Exactly one solution: a second model is all that has to be ruled out
+        return self.count_solutions(2, assumptions) == 1
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Count the solutions of puzzles, one solver per puzzle.')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of .clues files')
+    parser.add_argument('--limit', type=int, default=2, help='stop counting after this many solutions')
+    args = parser.parse_args()
+
+    for filename in collect_puzzles(args.paths):
+        puzzle = read_puzzle(filename)
+        with IncrementalSolver(puzzle.shape, puzzle.hints) as solver:
+            found = solver.count_solutions(args.limit)
+        if found == 1:
+            verdict = 'unique'
+        elif found == 0:
+            verdict = 'none'
+        else:
+            verdict = f'{found}+' if found == args.limit else str(found)
+        print(f'{verdict:<8} {filename}')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,158 @@
+# Line logic for a single row, column or hex axis line.
+#
+# Every cell is described by a domain: a bitmask of the states it can still take. Bit 0 (EMPTY) means the cell may be
+# empty, every other bit stands for one color. Blocks of the same color need at least one empty cell between them,
+# blocks of different colors may touch.
+
+EMPTY = 1
+
+
+def _prefix_table(domains, blocks, bits):
+    # fits[b][i]: number of ways the first b blocks can be placed in the first i cells
+    # gapped[b][i]: the same, with cell i - 1 left empty
+    n = len(domains)
+    k = len(blocks)
+
+    # blocked[bit][i]: number of cells among the first i that can't take the color bit
+    blocked = {}
+    for bit in set(bits):
+        counts = [0] * (n + 1)
+        for i, domain in enumerate(domains):
+            counts[i + 1] = counts[i] + (0 if domain & bit else 1)
+        blocked[bit] = counts
+
+    fits = [[0] * (n + 1) for _ in range(k + 1)]
+    gapped = [[0] * (n + 1) for _ in range(k + 1)]
+    fits[0][0] = 1
+
+    for i in range(1, n + 1):
+        can_be_empty = domains[i - 1] & EMPTY
+        for b in range(k + 1):
+            if can_be_empty:
+                gapped[b][i] = fits[b][i - 1]
+            fits[b][i] = gapped[b][i]
+            if b > 0:
+                # Block b - 1 ends right before cell i
+                fits[b][i] += _ending_here(fits, gapped, blocked, blocks, bits, b, i)
+
+    return fits, gapped, blocked
+
+
+def _ending_here(fits, gapped, blocked, blocks, bits, b, i):
+    # Number of ways the first b blocks fit into the first i cells with block b - 1 ending at cell i - 1
+    start = i - blocks[b - 1]
+    if start < 0 or blocked[bits[b - 1]][i] != blocked[bits[b - 1]][start]:
+        return 0
+    if b == 1:
+        return fits[0][start]
+    if bits[b - 2] == bits[b - 1]:
+        return gapped[b - 1][start]
+    return fits[b - 1][start]
+
+
+def count_placements(domains, blocks, bits):
+    # Number of placements of the blocks that are consistent with the domains, without enumerating them
+    fits, _, _ = _prefix_table(domains, blocks, bits)
+    return fits[len(blocks)][len(domains)]
+
+
+def placements(domains, blocks, bits):
+    """
+    Enumerate the placements of the blocks that are consistent with the domains.
+
+    The counting table is used to only follow choices that lead to a placement, so no time is spent on dead ends.
+
+    Parameters:
+    - domains: The current domain of every cell in the line.
+    - blocks: The block lengths in line order.
+    - bits: The color bit of every block.
+
+    Returns:
+    - A generator of rows, every row holds the state bit (EMPTY or a color bit) of every cell.
+    """
+    fits, gapped, blocked = _prefix_table(domains, blocks, bits)
+    # Cells i and later of the placement being built, the cells before i are written by the deeper calls
+    row = [EMPTY] * len(domains)
+
+    def fill(b, i, needs_gap):
+        # Fill the first i cells with the first b blocks, needs_gap if cell i - 1 has to be empty
+        if b == 0:
+            if fits[0][i]:
+                row[:i] = [EMPTY] * i
+                yield row.copy()
+            return
+        if gapped[b][i]:
+            row[i - 1] = EMPTY
+            yield from fill(b, i - 1, False)
+        if not needs_gap and _ending_here(fits, gapped, blocked, blocks, bits, b, i):
+            start = i - blocks[b - 1]
+            row[start:i] = [bits[b - 1]] * blocks[b - 1]
+            yield from fill(b - 1, start, b > 1 and bits[b - 2] == bits[b - 1])
+
+    return fill(len(blocks), len(domains), False)
+
+
+def solve_line(domains, blocks, bits):
+    """
+    Narrow the domains of a line to the states that appear in at least one placement of the blocks.
+
+    Parameters:
+    - domains: The current domain of every cell in the line.
+    - blocks: The block lengths in line order.
+    - bits: The color bit of every block.
+
+    Returns:
+    - The narrowed domains, or None if no placement is consistent with the line.
+    """
+    n = len(domains)
+    k = len(blocks)
+
+    fits, gapped, blocked = _prefix_table(domains, blocks, bits)
+    if not fits[k][n]:
+        return None
+    rfits, rgapped, _ = _prefix_table(domains[::-1], blocks[::-1], bits[::-1])
+
+    new_domains = [0] * n
+
+    # A cell can be empty if the blocks before it fit on its left and the others on its right
+    for i in range(n):
+        if domains[i] & EMPTY:
+            for b in range(k + 1):
+                if fits[b][i] and rfits[k - b][n - i - 1]:
+                    new_domains[i] = EMPTY
+                    break
+
+    # A block can start at s if the cells allow its color and the other blocks fit around it
+    for b, (length, bit) in enumerate(zip(blocks, bits)):
+        coverage = [0] * (n + 1)
+        counts = blocked[bit]
+        for start in range(n - length + 1):
+            end = start + length
+            if counts[end] != counts[start]:
+                continue
+            if b == 0:
+                left = fits[0][start]
+            elif bits[b - 1] == bit:
+                left = gapped[b][start]
+            else:
+                left = fits[b][start]
+            if not left:
+                continue
+            remaining = k - 1 - b
+            if b == k - 1:
+                right = rfits[0][n - end]
+            elif bits[b + 1] == bit:
+                right = rgapped[remaining][n - end]
+            else:
+                right = rfits[remaining][n - end]
+            if right:
+                coverage[start] += 1
+                coverage[end] -= 1
+
+        covered = 0
+        for i in range(n):
+            covered += coverage[i]
+            if covered:
+                new_domains[i] |= bit
+
+    return new_domains
@@ -1,41 +1,48 @@
+import gc
+import os
+import time
+import tracemalloc
+from array import array
+from functools import lru_cache
+from threading import Timer
 from sympy import Or, And, Not, Symbol
-from pysat.formula import CNF
+import numpy as np
+from pysat.formula import CNF, IDPool
 from pysat.solvers import Solver
-from itertools import count
+from itertools import chain, count
+from automaton import encode_line_automaton
+from cardinality import exactly_one
+from line_solver import EMPTY
+from hex_geometry import hex_geometry
+from portfolio import race
+from puzzle import read_puzzle
+from solve_cache import SolveCache, puzzle_key
+from symmetry import board_symmetries, symmetry_breaking_clauses
+from propagation import cell_color, color_bits, grid_size, initial_domains, is_solved, known_cells, propagate
 
 FILENAME = "clues/stripes-1.clues"
-colored = False
+ENCODER = "int"  # "int" builds integer clauses directly, "sympy" goes through SymPy expressions,
+# "automaton" encodes every line as a layered automaton instead of block starts (see automaton.py)
+EXACTLY_ONE = "auto"  # at-most-one encoding for the block starts, see cardinality.AT_MOST_ONE
+PROPAGATE = True  # try line propagation before building the CNF
+SOLVER = "minisat22"  # PySAT backend of clause_solver
+PORTFOLIO = None  # list of PySAT backends to race against each other instead (see portfolio.py)
+SYMMETRY = False  # look for mirrors and rotations the hints share and only search one of the symmetric solutions
+DIAGNOSE = False  # on unsatisfiable puzzles, look for the hint lines that contradict each other (slower)
+CACHE = True  # reuse the clauses and solutions of puzzles solved before, see solve_cache.py
+LINE_TEMPLATES = 1024  # line templates kept by line_template, lines with the same hints share one
+TEMPLATE_LITERALS = 1 << 13  # literals up to which a line template is kept, so the templates stay below 100 MB
+ENCODER_VERSION = 4  # part of the cache key, raise it whenever the encoders produce different clauses
 
 
 def get_content(filename):
-    with open(filename, 'r') as file:
-        # Read the entire content of the file
-        lines = file.readlines()
-
-        # Get the shape
-        first_line = lines[0].strip()
-        shape = first_line.split()
-
-        # Get the color
-        color = lines[1].strip().split()
-
-        # Get the hints
-        hints = []
-        for line in lines[2:]:
-            hint = line.strip()
-            hint_parts = hint.split()
-            hint_numbers = [int(part[:-1]) for part in hint_parts]  # Remove 'a' from the end
-            hint_colors = [part[-1] for part in hint_parts]  # Extract color ('a')
-            hints.append((hint_numbers, hint_colors))
+    puzzle = read_puzzle(filename)
+    shape, color, hints = puzzle.shape, puzzle.palette, puzzle.hints
 
     print(shape)
     print(color)
     print(hints)
 
-    global colored
-    if len(color) > 2:
-        colored = True
-
     return shape, color, hints
 
 
@@ -51,14 +58,8 @@ class Hex:
 
 
 def create_hex_board(edge_length):
-    board = {}
-    number = count(1)
-    for x in range(-edge_length, edge_length + 1):
-        for y in range(-edge_length, edge_length + 1):
-            z = -x - y
-            if -edge_length <= z <= edge_length and abs(x) + abs(y) + abs(z) <= 2 * edge_length - 1:
-                board[(x, y, z)] = next(number)
-    return board
+    # (x, y, z) -> variable id, shared with every other user of the same edge length
+    return hex_geometry(edge_length).cell_ids
 
 
 def exactly_one_true(clauses):
@@ -76,16 +77,12 @@ def exactly_one_true(clauses):
     return cnf_formula
 
 
-variables = []
-cells_in_row = {}
-cells_in_col = {}
-cells_in_x = {}
-cells_in_y = {}
-cells_in_z = {}
+def add_variable(variables, symbol):
+    # variables maps every symbol name to its id, a symbol that is already known keeps its id
+    variables.setdefault(str(symbol), len(variables) + 1)
 
 
-def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinates=None):
-    global variables, cells_in_row, cells_in_col
+def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinates, variables, cells_in_axis, colored):
     # print("hint_numbers", hint_numbers, "length", length)
     total_block_length = sum(hint_numbers)
     num_blocks = len(hint_colors)
@@ -126,22 +123,14 @@ def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinate
 
     # indexes to imply cells cant be filled without a start
     if axis == "r":
-        cells_in_row.update({f"x{index}_{i}": [] for i in range(length)})
+        cells_in_axis.update({f"x{index}_{i}": [] for i in range(length)})
     elif axis == "c":
-        cells_in_col.update({f"x{i}_{index}": [] for i in range(length)})
-    elif axis == "x":
-        for x, y, z in coordinates:
-            cells_in_x.update({f"x{x}_{y}_{z}": []})
-    elif axis == "y":
-        for x, y, z in coordinates:
-            cells_in_y.update({f"x{x}_{y}_{z}": []})
-    elif axis == "z":
+        cells_in_axis.update({f"x{i}_{index}": [] for i in range(length)})
+    else:
         for x, y, z in coordinates:
-            cells_in_z.update({f"x{x}_{y}_{z}": []})
+            cells_in_axis.update({f"x{x}_{y}_{z}": []})
 
-    # print("cells_in_x", cells_in_x)
-    # print("cells_in_y", cells_in_y)
-    # print("cells_in_z", cells_in_z)
+    # print("cells_in_axis", cells_in_axis)
 
     for block_index, block in enumerate(hint_numbers):
         #  print("block_index", block_index, "block", block)
@@ -160,7 +149,7 @@ def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinate
         # print("earliest_start", earliest_start, "latest_start", latest_start, "length", length)
         for j in range(earliest_start, latest_start):
             current_block_start = Symbol(f'{axis}axis_{index}_{j}_{block_index}')
-            variables.append(current_block_start)
+            add_variable(variables, current_block_start)
             starts.append(current_block_start)
 
             # This start Implies the next start cant be here or after here
@@ -174,7 +163,7 @@ def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinate
 
                 for i in range(length_depending_on_color):
                     if i <= latest_start:
-                        variables.append(Symbol(f'{axis}axis_{index}_{i}_{block_index + 1}'))
+                        add_variable(variables, Symbol(f'{axis}axis_{index}_{i}_{block_index + 1}'))
                         next_block_starts.append(
                             Or(Not(current_block_start), Not(Symbol(f'{axis}axis_{index}_{i}_{block_index + 1}'))))
                 args_that_imply.append(And(*next_block_starts))
@@ -187,19 +176,11 @@ def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinate
                 if axis == "r":
                     # print(index, j, i, current_block_start, length, earliest_start, latest_start)
                     cell = f'x{index}_{j + i}'
-                    cells_in_row[cell].append(current_block_start)
                 elif axis == "c":
                     cell = f'x{j + i}_{index}'
-                    cells_in_col[cell].append(current_block_start)
-                elif axis == "x":
-                    cell = f'x{coordinates[j + i][0]}_{coordinates[j + i][1]}_{coordinates[j + i][2]}'
-                    cells_in_x[cell].append(current_block_start)
-                elif axis == "y":
-                    cell = f'x{coordinates[j + i][0]}_{coordinates[j + i][1]}_{coordinates[j + i][2]}'
-                    cells_in_y[cell].append(current_block_start)
-                elif axis == "z":
+                else:
                     cell = f'x{coordinates[j + i][0]}_{coordinates[j + i][1]}_{coordinates[j + i][2]}'
-                    cells_in_z[cell].append(current_block_start)
+                cells_in_axis[cell].append(current_block_start)
 
                 def_filled[cell].append(current_block_start)
                 # print("here", current_block_start,cell)
@@ -245,50 +226,44 @@ def create_start_args(index, length, axis, hint_numbers, hint_colors, coordinate
     return And(*args_that_imply_only_one_start, *args_that_fill_cells, *args_that_imply, *def_true)
 
 
-run_counter = 0
-
-
-def generate_cnf(shape, hints):
-    global variables, cells_in_row, cells_in_col
+def generate_cnf(shape, hints, colored=False, axis_stats=None):
+    # Everything the lines share lives here, so every call starts from a clean state.
+    # axis_stats, if given, receives the lines, new variables and seconds spent in create_start_args per axis.
+    variables = {}
+    cells_in_axis = {axis: {} for axis in ["r", "c", "x", "y", "z"]}
+    run_counter = count(1)
 
     def generator(index, hint_numbers, hint_colors, axis, is_rect):
-        global run_counter
-        run_counter += 1
-        print("run_counter", run_counter)
+        if axis_stats is None:
+            return create_line_args(index, hint_numbers, hint_colors, axis, is_rect)
+        started = time.perf_counter()
+        known_variables = len(variables)
+        line_args = create_line_args(index, hint_numbers, hint_colors, axis, is_rect)
+        stats = axis_stats.setdefault(axis, {"lines": 0, "variables": 0, "seconds": 0.0})
+        stats["lines"] += 1
+        stats["variables"] += len(variables) - known_variables
+        stats["seconds"] += time.perf_counter() - started
+        return line_args
+
+    def create_line_args(index, hint_numbers, hint_colors, axis, is_rect):
+        print("run_counter", next(run_counter))
         if is_rect:
             if axis == "r":
-                rect_args = create_start_args(index, n, axis, hint_numbers, hint_colors)
+                rect_args = create_start_args(index, n, axis, hint_numbers, hint_colors, None, variables,
+                                              cells_in_axis[axis], colored)
             else:
-                rect_args = create_start_args(index, m, axis, hint_numbers, hint_colors)
+                rect_args = create_start_args(index, m, axis, hint_numbers, hint_colors, None, variables,
+                                              cells_in_axis[axis], colored)
 
             return rect_args
 
         elif not is_rect:
-            coordinates = []
-            line_length = 0
-            for x, y, z in board.keys():
-                if axis == "x":
-                    if x == index:
-                        line_length += 1
-                        coordinates.append((x, y, z))
-                elif axis == "y":
-                    if y == index:
-                        line_length += 1
-                        coordinates.append((x, y, z))
-                    q = []
-                    q.extend(hint_numbers)
-                    hint_numbers = q[::-1]
-                    r = []
-                    r.extend(hint_colors)
-                    hint_colors = r[::-1]
-
-                elif axis == "z":
-                    if z == index:
-                        line_length += 1
-                        coordinates.append((x, y, z))
+            coordinates = hex_geometry(edge).hint_line(axis, index)
+            line_length = len(coordinates)
 
             # print(axis, coordinates)
-            hex_args = create_start_args(index, line_length, axis, hint_numbers, hint_colors, coordinates)
+            hex_args = create_start_args(index, line_length, axis, hint_numbers, hint_colors, coordinates, variables,
+                                         cells_in_axis[axis], colored)
 
             return hex_args
 
@@ -302,7 +277,7 @@ def generate_cnf(shape, hints):
         # coordinates
         for i in range(m):
             for j in range(n):
-                variables.append(Symbol(f'x{i}_{j}'))
+                add_variable(variables, Symbol(f'x{i}_{j}'))
 
         # Parse the row and column hints
         row_hints = hints[:m]
@@ -318,21 +293,13 @@ def generate_cnf(shape, hints):
         # print(row_args, "\n", col_args)
         args = [*row_args, *col_args]
 
-        for keys, values in cells_in_row.items():
-            if values:
-                cell_args.append(Or(Not(keys), Or(*values)))
-
-        for keys, values in cells_in_col.items():
-            if values:
-                cell_args.append(Or(Not(keys), Or(*values)))
-
     elif shape[0] == "hex":
         edge = int(shape[1])  # Number of rows
 
         # coordinates
         board = create_hex_board(edge)
         for x, y, z in board.keys():
-            variables.append(Symbol(f'x{x}_{y}_{z}'))
+            add_variable(variables, Symbol(f'x{x}_{y}_{z}'))
         # print("variables", variables)
 
         hint_length = edge + edge - 1
@@ -350,17 +317,10 @@ def generate_cnf(shape, hints):
         # # print(row_args, "\n", col_args)
         args = [*x_args, *y_args, *z_args]
 
-    for keys, values in cells_in_x.items():
-        if values:
-            cell_args.append(Or(Not(Symbol(keys)), Or(*values)))
-
-    for keys, values in cells_in_y.items():
-        if values:
-            cell_args.append(Or(Not(Symbol(keys)), Or(*values)))
-
-    for keys, values in cells_in_z.items():
-        if values:
-            cell_args.append(Or(Not(Symbol(keys)), Or(*values)))
+    for cells_in_line in cells_in_axis.values():
+        for keys, values in cells_in_line.items():
+            if values:
+                cell_args.append(Or(Not(Symbol(keys)), Or(*values)))
 
     # print("cell_args", cell_args)
     args.append(And(*cell_args))
@@ -369,20 +329,356 @@ def generate_cnf(shape, hints):
     # print(And(*args))
     # dnf_to_cnf(args)
 
-    return And(*args)
+    return And(*args), variables
+
 
+def puzzle_lines(shape, hints):
+    # (axis, index, cells, hint_numbers, hint_colors) for every line, cells are 0-based grid indexes in variable order
+    lines = []
 
-def sympy_to_cnf(sympy_expr):
+    if shape[0] == "rect":
+        m = int(shape[1])  # Number of rows
+        n = int(shape[2])  # Number of columns
+
+        row_hints = hints[:m]
+        col_hints = hints[m:m + n]
+        for i, (hint_numbers, hint_colors) in enumerate(row_hints):
+            lines.append(("r", i, [i * n + j for j in range(n)], hint_numbers, hint_colors))
+        for j, (hint_numbers, hint_colors) in enumerate(col_hints):
+            lines.append(("c", j, [i * n + j for i in range(m)], hint_numbers, hint_colors))
+
+    elif shape[0] == "hex":
+        edge = int(shape[1])
+
+        geometry = hex_geometry(edge)
+        hint_length = edge + edge - 1
+        axis_hints = {"x": hints[:hint_length], "y": hints[hint_length:hint_length * 2], "z": hints[hint_length * 2:]}
+
+        for axis in ["x", "y", "z"]:
+            for i in range(-edge + 1, edge):
+                hint_numbers, hint_colors = axis_hints[axis][i + edge - 1]
+                lines.append((axis, i, geometry.hint_cells[axis][i + edge - 1], hint_numbers, hint_colors))
+
+    else:
+        raise ValueError("The first line must start with 'rect' or 'hex")
+
+    return lines
+
+
+def encoded_colors(bits):
+    # Colors that get their own variable per cell, in variable order. A monochrome puzzle needs none: filled is black.
+    return sorted(bits) if len(bits) > 1 else []
+
+
+class Encoder:
+    # Builds the integer CNF of one puzzle with the block start rules. All state lives on the instance,
+    # so encoders of different puzzles never share variables or clauses.
+
+    def __init__(self, shape, hints, exactly_one_encoding=None, clauses=None, guarded=False, line_encoding="starts"):
+        # clauses receives the clauses as they are created: a list by default, or anything with append, extend and
+        # len, like dimacs.DimacsWriter to stream them to a file.
+        # With guarded, the clauses of every line get a selector literal of their own, so a solver only enforces the
+        # lines whose selectors are assumed (see conflicting_lines). This needs clauses to be a list.
+        # line_encoding is "starts" for the block start rules or "automaton" for automaton.encode_line_automaton.
+        lines = puzzle_lines(shape, hints)
+        # Colored puzzles get one variable per cell and color, see color_variable
+        self.setup(lines, grid_size(lines), encoded_colors(color_bits(lines)), exactly_one_encoding, clauses, guarded,
+                   line_encoding)
+
+    def setup(self, lines, num_cells, colors, exactly_one_encoding, clauses, guarded, line_encoding):
+        # Everything __init__ and for_line share
+        self.lines = lines
+        self.num_cells = num_cells
+        self.colors = list(colors)
+        self.color_index = {color: i for i, color in enumerate(self.colors)}
+        # Grid cells get the first ids (in the same order as generate_cnf), then the color variables,
+        # start variables come after
+        self.pool = IDPool(start_from=self.num_cells * (len(self.colors) + 1) + 1)
+        self.exactly_one_encoding = exactly_one_encoding or EXACTLY_ONE
+        if line_encoding not in ("starts", "automaton"):
+            raise ValueError(f"Unknown line encoding: {line_encoding}")
+        self.line_encoding = line_encoding
+        self.clauses = [] if clauses is None else clauses
+        # For every axis the start variables covering each cell:
+        # cell_starts[axis][1][cell_starts[axis][0][cell]:cell_starts[axis][0][cell + 1]]
+        self.cell_starts = {}
+        # For every axis the number of lines, the variables and clauses they added and the seconds it took
+        self.axis_stats = {}
+        # (axis, index) of every line to its selector variable, only filled if guarded
+        self.selectors = {} if guarded else None
+
+    def encode(self):
+        # The clauses are millions of small lists without any reference cycles, the garbage collector would only walk
+        # over them again and again while they are built
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return self.encode_lines()
+        finally:
+            if collecting:
+                gc.enable()
+
+    def encode_lines(self):
+        axis_starts = {}
+        for axis, index, cells, hint_numbers, hint_colors in self.lines:
+            started = time.perf_counter()
+            known_variables = self.pool.top
+            known_clauses = len(self.clauses)
+            line_starts = self.encode_line([cell + 1 for cell in cells], hint_numbers, hint_colors)
+            stats = self.axis_stats.setdefault(axis, {"lines": 0, "variables": 0, "clauses": 0, "seconds": 0.0})
+            stats["lines"] += 1
+            stats["variables"] += self.pool.top - known_variables
+            stats["clauses"] += len(self.clauses) - known_clauses
+            stats["seconds"] += time.perf_counter() - started
+            if self.selectors is not None:
+                selector = self.pool.id()
+                self.selectors[(axis, index)] = selector
+                self.clauses[known_clauses:] = [[*clause, -selector] for clause in self.clauses[known_clauses:]]
+
+            starts_of_cell = axis_starts.setdefault(axis, [()] * self.num_cells)
+            for cell, starts in zip(cells, line_starts):
+                starts_of_cell[cell] = starts
+
+        # A cell is either empty or has exactly one color, so crossing lines have to agree on it
+        if self.colors:
+            for cell in range(self.num_cells):
+                cell_colors = [self.color_variable(cell, color) for color in self.colors]
+                self.clauses.extend(exactly_one(self.pool, [-(cell + 1), *cell_colors], self.exactly_one_encoding))
+
+        for axis, starts_of_cell in axis_starts.items():
+            offsets = array('I', [0])
+            starts = array('I')
+            for cell_starts in starts_of_cell:
+                starts.extend(cell_starts)
+                offsets.append(len(starts))
+            self.cell_starts[axis] = (offsets, starts)
+
+        return self.clauses
+
+    @classmethod
+    def for_line(cls, length, colors, exactly_one_encoding, line_encoding):
+        # An encoder of a single line without a puzzle: its cells are 1..length, followed by their color variables,
+        # so the clauses it builds are in local ids that line_template can move anywhere
+        encoder = cls.__new__(cls)
+        encoder.setup([], length, colors, exactly_one_encoding, None, False, line_encoding)
+        return encoder
+
+    def starts_of(self, axis, cell):
+        offsets, starts = self.cell_starts[axis]
+        return starts[offsets[cell]:offsets[cell + 1]]
+
+    def color_variable(self, cell, color):
+        # True if the 0-based cell has the color, only for colored puzzles
+        return self.num_cells + cell * len(self.colors) + self.color_index[color] + 1
+
+    def filled_with(self, cell_id, color):
+        # The variable that says a cell is filled with the color: its color variable, or the cell itself if the
+        # puzzle is monochrome
+        return self.color_variable(cell_id - 1, color) if self.colors else cell_id
+
+    def encode_line(self, line, hint_numbers, hint_colors):
+        # Encode a line by copying the template of its hints to its cells, see line_template.
+        # Returns the start variables covering every cell of the line.
+        template = line_template(len(line), tuple(hint_numbers), tuple(hint_colors), tuple(self.colors),
+                                 self.exactly_one_encoding, self.line_encoding)
+        if template is None:
+            # Too large to be kept, built for this line alone
+            return self.build_line(line, hint_numbers, hint_colors)
+        return template.place(self, line)
+
+    def build_line(self, line, hint_numbers, hint_colors):
+        # Same four rules as create_start_args, emitted as integer clauses. line holds the variable ids of the
+        # cells in traversal order. Returns the start variables covering every cell of the line.
+        clauses = self.clauses
+        length = len(line)
+        num_blocks = len(hint_numbers)
+        cell_starts = [[] for _ in range(length)]
+        # The same split by the color of the blocks, only needed for colored puzzles
+        cell_color_starts = [{} for _ in range(length)] if self.colors else None
+
+        if num_blocks == 0:
+            clauses.extend([-cell] for cell in line)
+            return cell_starts
+
+        if self.line_encoding == "automaton":
+            # No start variables, so no cell is covered by any
+            encode_line_automaton(self.pool, clauses, line, hint_numbers, hint_colors, self.filled_with,
+                                  self.exactly_one_encoding)
+            return cell_starts
+
+        # Blocks of the same color need a space between them. Monochrome hints all share one color,
+        # so this also covers the uncolored case.
+        minimum_required_spaces = 0
+        for i in range(1, num_blocks):
+            if hint_colors[i] == hint_colors[i - 1]:
+                minimum_required_spaces += 1
+
+        total_occupied_cells = sum(hint_numbers) + minimum_required_spaces
+
+        # Possible start positions of every block, the start variables of a block are numbered consecutively
+        start_ranges = []
+        first_start = []
+        earliest_start = 0
+        latest_start = length - total_occupied_cells + 1
+        for block_index, block in enumerate(hint_numbers):
+            start_ranges.append((earliest_start, latest_start))
+            first_start.append(self.pool.top + 1)
+            for _ in range(earliest_start, latest_start):
+                self.pool.id()
+            if block_index < num_blocks - 1 and hint_colors[block_index] != hint_colors[block_index + 1]:
+                earliest_start += block
+                latest_start += block
+            else:
+                earliest_start += block + 1
+                latest_start += block + 1
+
+        for block_index, block in enumerate(hint_numbers):
+            earliest_start, latest_start = start_ranges[block_index]
+            color = hint_colors[block_index]
+            starts = list(range(first_start[block_index], first_start[block_index] + latest_start - earliest_start))
+
+            # Rule 2: there can only be one start. A block without any start (the hints need more cells than the line
+            # has) gets the empty clause, which makes the puzzle unsatisfiable, and nothing else.
+            clauses.extend(exactly_one(self.pool, starts, self.exactly_one_encoding))
+            if not starts:
+                continue
+
+            for j, current_block_start in zip(range(earliest_start, latest_start), starts):
+                # Rule 1: this start implies the next block can't start here or before the end of this block
+                if block_index < num_blocks - 1:
+                    next_earliest, next_latest = start_ranges[block_index + 1]
+                    next_first = first_start[block_index + 1] - next_earliest
+                    length_depending_on_color = j + block + 1
+                    if hint_colors[block_index] != hint_colors[block_index + 1]:
+                        length_depending_on_color = j + block
+                    for i in range(next_earliest, min(length_depending_on_color, next_latest)):
+                        clauses.append([-current_block_start, -(next_first + i)])
+
+                # Rule 3: this start implies the cells in it have to be filled with its color
+                for i in range(j, j + block):
+                    clauses.append([-current_block_start, self.filled_with(line[i], color)])
+                    cell_starts[i].append(current_block_start)
+                    if cell_color_starts is not None:
+                        cell_color_starts[i].setdefault(color, []).append(current_block_start)
+
+            # Cells covered by every start of this block are filled for sure
+            for i in range(max(latest_start - 1, earliest_start), earliest_start + block):
+                clauses.append([self.filled_with(line[i], color)])
+
+        # Rule 4: a filled cell implies one of the starts covering it
+        for cell, starts in zip(line, cell_starts):
+            clauses.append([-cell, *starts])
+
+        # The same for every color: a cell of this color implies one of the starts of this color covering it
+        if cell_color_starts is not None:
+            for cell, color_starts in zip(line, cell_color_starts):
+                for color in self.colors:
+                    clauses.append([-self.color_variable(cell - 1, color), *color_starts.get(color, [])])
+
+        return cell_starts
+
+
+class LineTemplate:
+    # The clauses of one line in local ids (see Encoder.for_line), kept as flat arrays of variable indexes and signs.
+    # place() moves them onto the cells of a line in a few array operations instead of building them again.
+
+    def __init__(self, length, num_colors, num_variables, clauses, cell_starts):
+        self.length = length
+        self.num_colors = num_colors
+        self.num_variables = num_variables  # variables the line adds: block starts and exactly-one helpers
+        # Compact types, since many templates are kept at once: local ids and clause ends fit in 32 bits
+        literals = np.fromiter((literal for clause in clauses for literal in clause), dtype=np.int32)
+        self.indexes = np.abs(literals)
+        self.signs = np.sign(literals).astype(np.int8)
+        self.ends = np.cumsum([len(clause) for clause in clauses], dtype=np.int32)
+        # The start variables covering every cell, flat: cell i owns start_ids[start_offsets[i]:start_offsets[i + 1]]
+        self.start_ids = np.fromiter(chain.from_iterable(cell_starts), dtype=np.int32)
+        self.start_offsets = np.cumsum([0, *map(len, cell_starts)], dtype=np.int32)
+
+    def place(self, encoder, line):
+        base = self.length * (self.num_colors + 1)
+        shift = encoder.pool.top - base
+        # Local id -> id in the puzzle: the cells, their color variables, then fresh variables from the pool
+        mapping = np.zeros(base + self.num_variables + 1, dtype=np.int64)
+        cells = np.array(line, dtype=np.int64)
+        mapping[1:self.length + 1] = cells
+        if self.num_colors:
+            mapping[self.length + 1:base + 1] = (encoder.num_cells + (cells[:, None] - 1) * self.num_colors
+                                                 + np.arange(1, self.num_colors + 1)).ravel()
+        mapping[base + 1:] = np.arange(base + 1, base + self.num_variables + 1) + shift
+        encoder.pool.top += self.num_variables
+
+        literals = (self.signs * mapping[self.indexes]).tolist()
+        ends = self.ends.tolist()
+        encoder.clauses.extend([literals[start:end] for start, end in zip(chain((0,), ends), ends)])
+        starts = (self.start_ids + shift).tolist()
+        offsets = self.start_offsets.tolist()
+        return [starts[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+@lru_cache(maxsize=LINE_TEMPLATES)
+def line_template(length, hint_numbers, hint_colors, colors, exactly_one_encoding, line_encoding):
+    # Lines with the same length, hints and puzzle colors get the same clauses up to the ids of their variables, so
+    # they are built once per process (in the same puzzle or across a whole corpus) and only copied afterwards.
+    # Lines with more than TEMPLATE_LITERALS literals get None, Encoder.encode_line builds them directly.
+    encoder = Encoder.for_line(length, colors, exactly_one_encoding, line_encoding)
+    base = encoder.pool.top
+    cell_starts = encoder.build_line(list(range(1, length + 1)), list(hint_numbers), list(hint_colors))
+    if sum(map(len, encoder.clauses)) > TEMPLATE_LITERALS:
+        return None
+    return LineTemplate(length, len(colors), encoder.pool.top - base, encoder.clauses, cell_starts)
+
+
+def generate_int_cnf(shape, hints):
+    return Encoder(shape, hints).encode()
+
+
+def fixed_cell_clauses(domains):
+    # Unit clauses for the cells line propagation already decided
+    clauses = []
+    for cell, known in enumerate(known_cells(domains)):
+        if known is not None:
+            clauses.append([cell + 1] if known else [-(cell + 1)])
+    return clauses
+
+
+def color_model_to_grid(model, shape, hints):
+    # The color of every cell read straight from the color variables of Encoder, one model lookup per cell and color
+    lines = puzzle_lines(shape, hints)
+    bits = color_bits(lines)
+    colors = encoded_colors(bits)
+    num_cells = grid_size(lines)
+
+    domains = [EMPTY] * num_cells
+    for cell in range(num_cells):
+        if model[cell] > 0:
+            if not colors:
+                domains[cell] = sum(bits.values())
+                continue
+            first = num_cells + cell * len(colors)
+            for i, color in enumerate(colors):
+                if model[first + i] > 0:
+                    domains[cell] = bits[color]
+                    break
+    return domains_to_grid(shape, domains, bits)
+
+
+def model_to_domains(model, domains):
+    # Restrict every cell to filled or empty as the model says, the colors are left to line propagation
+    for value in model:
+        cell = abs(value) - 1
+        if cell < len(domains):
+            domains[cell] = domains[cell] & ~EMPTY if value > 0 else EMPTY
+    return domains
+
+
+def sympy_to_cnf(sympy_expr, variables):
     # print("in")
     # print(sympy_expr)
     # Extract dimensions
-    global variables
-    variable_map = {}
-
-    for i, item in enumerate(variables):
-        variable_map[str(item)] = i + 1
+    variable_map = variables
 
-        # print(variable_map)
+    # print(variable_map)
 
     #        print("variable_map", variable_map["c001"])
 
@@ -433,18 +729,37 @@ def sympy_to_cnf(sympy_expr):
     return clauses
 
 
-def sat_solver(sympy_expr):
+def sat_solver(sympy_expr, variables):
     # Convert SymPy expression to CNF format for PySAT
-    cnf_clauses = sympy_to_cnf(sympy_expr)
+    cnf_clauses = sympy_to_cnf(sympy_expr, variables)
     # print(cnf_clauses)
     # print(cnf_clauses)
+    return clause_solver(cnf_clauses)
+
+
+def clause_solver(cnf_clauses, time_limit=None, stats=None):
+    # stats, if given, receives the size of the formula and the solver counters (conflicts, decisions, ...)
     # Initialize CNF with the clauses
     cnf = CNF(from_clauses=cnf_clauses)
 
     # create a SAT solver for this formula:
-    with Solver(name='minisat22') as solver:
+    with Solver(name=SOLVER) as solver:
         solver.append_formula(cnf)
-        is_satisfiable = solver.solve()
+        if stats is not None:
+            stats["variables"] = solver.nof_vars()
+            stats["clauses"] = solver.nof_clauses()
+        if time_limit is None:
+            is_satisfiable = solver.solve()
+        else:
+            # Interrupt the solver from a timer thread once the time limit is over
+            timer = Timer(time_limit, solver.interrupt)
+            timer.start()
+            is_satisfiable = solver.solve_limited(expect_interrupt=True)
+            timer.cancel()
+        if stats is not None:
+            stats.update(solver.accum_stats())
+        if is_satisfiable is None:
+            raise TimeoutError(f"No answer within {time_limit} seconds")
         if is_satisfiable:
             model = solver.get_model()
             # print("Satisfiable with model:", model)
@@ -454,11 +769,62 @@ def sat_solver(sympy_expr):
             print("Unsatisfiable")
             print(solver.accum_stats())
 
-            # print("Proof", solver.get_proof())
-            print('and the unsatisfiable core is:', solver.get_core())
+
+def conflicting_lines(shape, hints):
+    """
+    Find hint lines that cannot all be satisfied at the same time.
+
+    Every line is encoded behind a selector literal and the puzzle is solved with all selectors as assumptions. The
+    unsatisfiable core the solver reports is then shrunk one line at a time: a line is dropped whenever the rest still
+    has no solution, so every line that is left is needed for the contradiction.
+
+    Returns:
+    - (axis, index) of the conflicting lines, empty if the puzzle has a solution.
+    """
+    encoder = Encoder(shape, hints, guarded=True)
+    encoder.encode()
+    lines = {selector: line for line, selector in encoder.selectors.items()}
+    with Solver(name=SOLVER, bootstrap_with=encoder.clauses) as solver:
+        if solver.solve(assumptions=list(lines)):
+            return []
+        core = solver.get_core()
+        for selector in list(core):
+            if selector not in core:
+                continue
+            rest = [other for other in core if other != selector]
+            if not solver.solve(assumptions=rest):
+                # The contradiction does not need this line, the new core may be even smaller
+                core = solver.get_core()
+    return sorted(lines[selector] for selector in core)
+
+
+def describe_line(shape, hints, axis, index):
+    # A line and its hints as they are written in the .clues file, e.g. "row 3: 2a 1b"
+    if shape[0] == "rect":
+        position = index if axis == "r" else int(shape[1]) + index
+        name = f'{"row" if axis == "r" else "column"} {index}'
+    else:
+        hint_length = 2 * int(shape[1]) - 1
+        position = "xyz".index(axis) * hint_length + index + int(shape[1]) - 1
+        name = f'{axis} line {index}'
+    hint_numbers, hint_colors = hints[position]
+    return f'{name}: {" ".join(f"{n}{c}" for n, c in zip(hint_numbers, hint_colors)) or "(empty)"}'
+
+
+def report_conflict(shape, hints, result):
+    # Diagnostics mode: print and record the lines that contradict each other
+    conflict = conflicting_lines(shape, hints)
+    result["conflict"] = [describe_line(shape, hints, axis, index) for axis, index in conflict]
+    print("These hints contradict each other:")
+    for line in result["conflict"]:
+        print("  " + line)
 
 
 def write_model_to_file(model, shape, hints, filename):
+    write_grid_to_file(model_to_grid(model, shape, hints), filename)
+
+
+def model_to_grid(model, shape, hints):
     # Extract dimensions from the shape
     def get_blocks_and_colors(hints):
         block_lengths = []
@@ -499,30 +865,13 @@ def write_model_to_file(model, shape, hints, filename):
                 else:
                     grid[row][col] = '-'
     else:
-        # Generate the hexagonal board (the dictionary containing (x, y, z) as keys)
-        board = create_hex_board(int(shape[1]))
+        # Rows follow the x levels, the geometry knows the row and column of every cell
+        geometry = hex_geometry(int(shape[1]))
 
-        # Extract hex coordinates from the board
-        hex_coords = list(board.keys())
+        # Initialize the result grid based on x levels
+        result_grid = geometry.empty_grid()
 
-        # Determine unique z levels
-        x_levels = sorted(set(x for _, _, x in hex_coords))
-
-        # Create a dictionary to map z levels to their respective rows in the result grid
-        row_mapping = {x: [] for x in x_levels}
-
-        # Populate the row_mapping with coordinates for each z level
-        for coord in hex_coords:
-            x, y, z = coord
-            row_mapping[x].append((x, y, z))
-
-        # Initialize the result grid based on z levels
-        result_grid = [['-' for _ in range(len(row_mapping[x]))] for x in x_levels]
-
-        # Flattened grid for easier indexing
-        flattened_grid = hex_coords
-
-        num_grid_vars = len(flattened_grid)
+        num_grid_vars = len(geometry.cells)
 
         # Initialize pointers for block lengths and colors
         block_index = 0
@@ -532,11 +881,9 @@ def write_model_to_file(model, shape, hints, filename):
         for value in model:
             if abs(value) <= num_grid_vars:  # Only consider grid variables
                 index = abs(value) - 1  # Convert to 0-based index
-                x, y, z = flattened_grid[index]  # Retrieve coordinates from the flattened grid
 
                 # Find the correct row and column in the result grid
-                row_idx = x_levels.index(x)  # Row index based on z level
-                col_idx = row_mapping[x].index((x, y, z))  # Column index within the row
+                row_idx, col_idx = geometry.positions[index]
 
                 # Determine color based on block_lengths and colors
                 if value > 0 and block_index < len(block_lengths):
@@ -552,19 +899,165 @@ def write_model_to_file(model, shape, hints, filename):
 
         grid = result_grid
 
+    return grid
+
+
+def domains_to_grid(shape, domains, bits):
+    if shape[0] == 'rect':
+        cols = int(shape[2])
+        cells = [cell_color(domain, bits) for domain in domains]
+        return [cells[i:i + cols] for i in range(0, len(cells), cols)]
+
+    # Hex rows follow the x levels, cells within a row keep the board order (same as write_model_to_file)
+    geometry = hex_geometry(int(shape[1]))
+    grid = geometry.empty_grid()
+    for cell, (row, col) in enumerate(geometry.positions):
+        grid[row][col] = cell_color(domains[cell], bits)
+    return grid
+
+
+def write_grid_to_file(grid, filename):
     # Write the grid to a file
-    with open(filename.replace("clues", "solutions").replace("generated", "generated_solutions"), "w") as file:
+    solution_path = str(filename).replace("clues", "solutions").replace("generated", "generated_solutions")
+    os.makedirs(os.path.dirname(solution_path) or ".", exist_ok=True)
+    with open(solution_path, "w") as file:
         for row in grid:
             file.write("".join(row) + "\n")
 
 
+def solve(filename, time_limit=None, puzzle=None):
+    # Solve one puzzle and write its solution. Returns the outcome and the seconds spent in every phase.
+    # An already parsed puzzle can be passed in, it is then written to the solution file of filename.
+    # While tracemalloc is tracing, the peak memory of every phase is recorded as well (see profiling.py).
+    result = {"file": str(filename), "status": None}
+
+    def phase(name, started):
+        result[name] = time.perf_counter() - started
+        if tracemalloc.is_tracing():
+            result.setdefault("peak_memory", {})[name] = tracemalloc.get_traced_memory()[1]
+            # Python 3.8 has no reset_peak, there every peak is the highest use since tracing started
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    if puzzle is None:
+        puzzle = read_puzzle(filename)
+    shape, hints = puzzle.shape, puzzle.hints
+    started = phase("parse", started)
+
+    cache = key = None
+    if CACHE:
+        cache = SolveCache()
+        key = puzzle_key(puzzle, ENCODER, EXACTLY_ONE, ENCODER_VERSION)
+        cached = cache.load_result(key)
+        if cached is not None:
+            # Solved before, nothing left to encode or solve
+            status, grid = cached
+            print("Solution taken from the cache")
+            if grid is not None:
+                write_grid_to_file(grid, filename)
+            phase("write", started)
+            result["status"] = status
+            result["cache"] = "solution"
+            if status == "unsat" and DIAGNOSE:
+                report_conflict(shape, hints, result)
+            return result
+
+    domains = None
+    if PROPAGATE:
+        lines = puzzle_lines(shape, hints)
+        bits = color_bits(lines)
+        domains = propagate(lines, initial_domains(grid_size(lines), bits), bits)
+        started = phase("propagate", started)
+        if domains is None:
+            print("Unsatisfiable")
+            if cache is not None:
+                cache.store_result(key, "unsat")
+            result["status"] = "unsat"
+            if DIAGNOSE:
+                report_conflict(shape, hints, result)
+            return result
+        if is_solved(domains):
+            print("Solved by line propagation")
+            grid = domains_to_grid(shape, domains, bits)
+            write_grid_to_file(grid, filename)
+            if cache is not None:
+                cache.store_result(key, "propagation", grid)
+            phase("write", started)
+            result["status"] = "propagation"
+            return result
+
+    cnf_clauses = None if cache is None else cache.load_cnf(key)
+    if cnf_clauses is not None:
+        result["cache"] = "cnf"
+    else:
+        result["axes"] = {}
+        if ENCODER == "sympy":
+            expression, variables = generate_cnf(shape, hints, puzzle.colored, result["axes"])
+            converting = time.perf_counter()
+            cnf_clauses = sympy_to_cnf(expression, variables)
+            result["sympy_to_cnf"] = time.perf_counter() - converting
+        else:
+            encoder = Encoder(shape, hints, line_encoding="automaton" if ENCODER == "automaton" else "starts")
+            cnf_clauses = encoder.encode()
+            result["axes"] = encoder.axis_stats
+        if cache is not None:
+            # Stored before the fixed cells are added, those are cheap to find again
+            cache.store_cnf(key, cnf_clauses)
+    if domains is not None:
+        # Hand the cells line propagation could fix to the SAT solver
+        cnf_clauses.extend(fixed_cell_clauses(domains))
+    if SYMMETRY:
+        symmetries = board_symmetries(shape, puzzle_lines(shape, hints))
+        breaking = []
+        if symmetries:
+            pool = IDPool(start_from=max(abs(literal) for clause in cnf_clauses for literal in clause) + 1)
+            breaking = symmetry_breaking_clauses(symmetries, pool)
+            cnf_clauses.extend(breaking)
+        result["symmetries"] = {"found": [name for name, _ in symmetries], "clauses": len(breaking)}
+    started = phase("encode", started)
+
+    try:
+        result["solver"] = {}
+        if PORTFOLIO:
+            _, model = race(cnf_clauses, PORTFOLIO, time_limit, result["solver"])
+        else:
+            model = clause_solver(cnf_clauses, time_limit, result["solver"])
+    except TimeoutError:
+        phase("solve", started)
+        result["status"] = "timeout"
+        return result
+    started = phase("solve", started)
+    if not model:
+        if cache is not None:
+            cache.store_result(key, "unsat")
+        result["status"] = "unsat"
+        if DIAGNOSE:
+            report_conflict(shape, hints, result)
+        return result
+
+    result["status"] = "sat"
+    grid = None
+    if ENCODER != "sympy":
+        # The colors are part of the model
+        grid = color_model_to_grid(model, shape, hints)
+    elif domains is not None:
+        # The SymPy model only says which cells are filled, line propagation works out their colors
+        solved = propagate(lines, model_to_domains(model, domains), bits)
+        if solved is not None:
+            grid = domains_to_grid(shape, solved, bits)
+    if grid is None:
+        grid = model_to_grid(model, shape, hints)
+    write_grid_to_file(grid, filename)
+    if cache is not None:
+        cache.store_result(key, "sat", grid)
+    phase("write", started)
+    return result
+
+
 def main():
-    shape, color, hints = get_content(FILENAME)
-    cnf_formula = generate_cnf(shape, hints)
-    # print("cnf_formula", is_cnf(cnf_formula), cnf_formula)
-    model = sat_solver(cnf_formula)
-    if model:
-        write_model_to_file(model, shape, hints, FILENAME)
+    solve(FILENAME)
 
 
 if __name__ == '__main__':
@@ -1,33 +1,30 @@
-import sys, requests, pathlib, json
+import sys, pathlib
 
 if len(sys.argv) != 4:
     print('Usage: nonogram.py [check|visualize] path/to/nonogram.clues path/to/nonogram.solution')
     sys.exit()
 
-
-def read(file):
-    with open(file) as fp:
-        return fp.read()
-
 goal = sys.argv[1]
 assert goal in {'check', 'visualize'}
-clues = read(sys.argv[2])
-clue_lines = clues.splitlines()
-solution_path = pathlib.Path(sys.argv[3])
 
-data = {
-    'goal': goal,
-    'clues': clues,
-    # solution file format is different on the server
-    'solution': 'anonymous problem\n' + clue_lines[0].split()[0] + '\n' + clue_lines[1] + '\n' + read(solution_path).replace('-', '0').replace('a', '1').replace('b', '2').replace('c', '3'),
-}
+# Both goals are handled locally, no need to ask the server
+if goal == 'check':
+    from verify import verify
+    mismatches = verify(sys.argv[2], sys.argv[3])
+    print('Correct' if not mismatches else 'Wrong\n' + '\n'.join(mismatches))
+    sys.exit()
 
-response = requests.get(f'http://jfschaefer.de:8973/verify/ss23a31a/nonograms', data=json.dumps(data))
+from puzzle import read_puzzle
+from verify import read_grid
+from visualize import render_svg
 
-if goal == 'check':
-    print(response.text)
-else:
-    path = solution_path.parent / (solution_path.name + '.html')
-    print(f'Creating {path}')
-    with open(path, 'w') as fp:
-        fp.write(f'<html><body><div style="width: 10cm;">{response.text}</div></body></html>')
+solution_path = pathlib.Path(sys.argv[3])
+picture = render_svg(read_puzzle(sys.argv[2]), read_grid(solution_path))
+if picture is None:
+    print('The solution does not fit the board')
+    sys.exit()
+
+path = solution_path.parent / (solution_path.name + '.html')
+print(f'Creating {path}')
+with open(path, 'w') as fp:
+    fp.write(f'<html><body><div style="width: 10cm;">{picture}</div></body></html>')
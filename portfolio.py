@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import pathlib
+import queue
+import time
+
+from pysat.solvers import Solver
+
+PORTFOLIO = ["minisat22", "glucose4", "cadical153", "lingeling", "maplechrono"]
+WINS_FILE = "portfolio_wins.json"
+POLL_INTERVAL = 0.5  # seconds between checks for backends that died without answering
+
+
+def _run_backend(name, clauses, answers):
+    # Runs in a child process: solve with one backend and report the outcome
+    try:
+        with Solver(name=name, bootstrap_with=clauses) as solver:
+            satisfiable = solver.solve()
+            answers.put((name, "sat" if satisfiable else "unsat", solver.get_model() if satisfiable else None,
+                         solver.accum_stats()))
+    except Exception as error:
+        answers.put((name, "error", str(error), {}))
+
+
+def race(clauses, solvers=PORTFOLIO, time_limit=None, stats=None):
+    """
+    Solve the same clauses with several SAT backends at once and take the first answer.
+
+    Every backend runs in its own forked process, so the clauses are shared with the children instead of being
+    copied to them. Where fork is not available (Windows), the default start method is used and every child gets a
+    copy of the clauses. As soon as one backend answers, the others are killed. A backend that cannot be loaded or dies
+    without answering counts as failed; only if every backend fails is that an error.
+
+    Parameters:
+    - clauses: The CNF as a list of integer clauses.
+    - solvers: PySAT solver names.
+    - time_limit: Seconds to wait for an answer, None for no limit.
+    - stats: If given, receives the name of the winning backend and its solver counters.
+
+    Returns:
+    - The name of the backend that answered first and its model (None if the clauses are unsatisfiable).
+    """
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    answers = context.Queue()
+    processes = [context.Process(target=_run_backend, args=(name, clauses, answers), daemon=True) for name in solvers]
+    for process in processes:
+        process.start()
+
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    failures = {}
+    try:
+        while True:
+            wait = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+            try:
+                name, outcome, model, solver_stats = answers.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"No answer within {time_limit} seconds")
+                # A backend that was killed (a crash or an out-of-memory kill in the native solver) never posts an
+                # answer, it fails the same way as one that could not be loaded
+                for backend, process in zip(solvers, processes):
+                    if backend not in failures and not process.is_alive() and process.exitcode != 0:
+                        failures[backend] = f"exited with code {process.exitcode}"
+                outcome = None
+            if outcome == "error":
+                # A backend that is not available only counts if none of them works
+                failures[name] = model
+            if len(failures) == len(processes):
+                raise RuntimeError("No backend could solve the clauses ("
+                                   + "; ".join(f"{backend}: {reason}" for backend, reason in failures.items()) + ")")
+            if outcome in (None, "error"):
+                continue
+            if stats is not None:
+                stats.update(solver_stats)
+                stats["backend"] = name
+            print(f"{name} answered first")
+            return name, model
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        for process in processes:
+            process.join()
+
+
+def load_wins(path=WINS_FILE):
+    # {puzzle class: {backend: number of wins}}
+    path = pathlib.Path(path)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def best_backend(wins, bucket, default="minisat22"):
+    # The backend that won most often for a puzzle class
+    counts = wins.get(bucket)
+    return max(counts, key=counts.get) if counts else default
+
+
+def main_cli():
+    import main
+    from batch import collect_puzzles
+    from benchmark import bucket_of
+    from puzzle import read_puzzle
+
+    parser = argparse.ArgumentParser(description='Race SAT backends on puzzles and count which one wins per class.')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of .clues files')
+    parser.add_argument('--solvers', nargs='+', default=PORTFOLIO, help='PySAT solver names')
+    parser.add_argument('--timeout', type=float, default=None, help='seconds per puzzle')
+    parser.add_argument('--wins', default=WINS_FILE, help='JSON file the wins are added to')
+    args = parser.parse_args()
+
+    main.PORTFOLIO = args.solvers
+    main.CACHE = False
+    wins = load_wins(args.wins)
+    for filename in collect_puzzles(args.paths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = main.solve(filename, args.timeout)
+        backend = result.get("solver", {}).get("backend")
+        print(f'{result["status"]:<12} {backend or "-":<12} {result.get("solve", 0):>8.3f}  {filename}')
+        if backend:
+            bucket = bucket_of(read_puzzle(filename))
+            wins.setdefault(bucket, {})
+            wins[bucket][backend] = wins[bucket].get(backend, 0) + 1
+
+    pathlib.Path(args.wins).write_text(json.dumps(wins, indent=2, sort_keys=True) + "\n")
+    print()
+    for bucket, counts in sorted(wins.items()):
+        summary = ", ".join(f"{backend}: {number}" for backend, number in sorted(counts.items(), key=lambda c: -c[1]))
+        print(f'{bucket:<28} best: {best_backend(wins, bucket):<12} ({summary})')
+
+
+if __name__ == '__main__':
+    main_cli()
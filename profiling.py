@@ -0,0 +1,67 @@
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+import main
+from batch import collect_puzzles
+
+
+def profile_solve(filename, time_limit=None, memory=True):
+    """
+    Solve one puzzle with main.solve and collect everything it measured.
+
+    Parameters:
+    - filename: The .clues file.
+    - time_limit: SAT time limit in seconds, None for no limit.
+    - memory: Trace allocations to record the peak memory of every phase, this makes solving slower.
+
+    Returns:
+    - The result of main.solve: status, seconds per phase, "peak_memory" (bytes per phase), "axes" (lines,
+      variables, clauses and seconds of the encoding per axis), "sympy_to_cnf" (seconds, SymPy encoder only) and
+      "solver" (formula size and the PySAT counters: conflicts, decisions, propagations, restarts).
+    """
+    started = time.perf_counter()
+    if memory:
+        tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = main.solve(filename, time_limit)
+    except Exception as error:
+        result = {"file": str(filename), "status": f"error: {error}"}
+    finally:
+        if memory:
+            tracemalloc.stop()
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def write_profile(results, file):
+    # One JSON object per line, so the profiles of several runs can be appended to the same file and compared
+    for result in results:
+        file.write(json.dumps(result, sort_keys=True) + "\n")
+        file.flush()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Profile the solver phase by phase, one JSON line per puzzle.')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of .clues files')
+    parser.add_argument('--output', default=None, help='JSON lines file to append to (default: standard output)')
+    parser.add_argument('--timeout', type=float, default=None, help='SAT time limit per puzzle in seconds')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc, timings are more accurate')
+    args = parser.parse_args()
+
+    # The cache would hide the encoding and solving work that is to be measured
+    main.CACHE = False
+
+    # Puzzles are profiled one after the other so they don't compete for the CPU
+    with (open(args.output, 'a') if args.output else contextlib.nullcontext(sys.stdout)) as file:
+        for filename in collect_puzzles(args.paths):
+            write_profile([profile_solve(filename, args.timeout, not args.no_memory)], file)
+
+
+if __name__ == '__main__':
+    main_cli()
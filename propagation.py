@@ -0,0 +1,80 @@
+from collections import deque
+
+from line_solver import EMPTY, solve_line
+
+
+def color_bits(lines):
+    # Every color letter used in the hints gets its own bit, bit 0 is reserved for empty cells
+    colors = sorted({color for _, _, _, _, hint_colors in lines for color in hint_colors})
+    return {color: 1 << (i + 1) for i, color in enumerate(colors)}
+
+
+def grid_size(lines):
+    # Every cell lies on exactly one row (rect) or x line (hex)
+    return sum(len(cells) for axis, _, cells, _, _ in lines if axis in ("r", "x"))
+
+
+def known_cells(domains):
+    # 1 for cells that are filled for sure, 0 for empty ones, None if still open
+    return [0 if domain == EMPTY else None if domain & EMPTY else 1 for domain in domains]
+
+
+def initial_domains(num_cells, bits):
+    return [EMPTY | sum(bits.values())] * num_cells
+
+
+def is_solved(domains):
+    return all(domain & (domain - 1) == 0 for domain in domains)
+
+
+def cell_color(domain, bits):
+    # Letter of the lowest color a cell can take, '-' for empty cells
+    if domain == EMPTY:
+        return '-'
+    for color, bit in bits.items():
+        if domain & bit:
+            return color
+    return '-'
+
+
+def propagate(lines, domains, bits):
+    """
+    Apply line logic until no line can fix any more cells.
+
+    Parameters:
+    - lines: (axis, index, cells, hint_numbers, hint_colors) for every line, cells are 0-based grid indexes.
+    - domains: The domain of every grid cell, updated in place.
+    - bits: The color bit of every color letter.
+
+    Returns:
+    - The domains, or None if some line has no placement left.
+    """
+    cell_lines = [[] for _ in domains]
+    for line_index, (_, _, cells, _, _) in enumerate(lines):
+        for cell in cells:
+            cell_lines[cell].append(line_index)
+
+    line_bits = [[bits[color] for color in hint_colors] for _, _, _, _, hint_colors in lines]
+
+    # Only lines with a newly fixed cell have to be looked at again
+    worklist = deque(range(len(lines)))
+    queued = [True] * len(lines)
+
+    while worklist:
+        line_index = worklist.popleft()
+        queued[line_index] = False
+        _, _, cells, hint_numbers, _ = lines[line_index]
+
+        new_domains = solve_line([domains[cell] for cell in cells], hint_numbers, line_bits[line_index])
+        if new_domains is None:
+            return None
+
+        for cell, domain in zip(cells, new_domains):
+            if domain != domains[cell]:
+                domains[cell] = domain
+                for other in cell_lines[cell]:
+                    if not queued[other]:
+                        queued[other] = True
+                        worklist.append(other)
+
+    return domains
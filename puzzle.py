@@ -0,0 +1,122 @@
+import os
+import pathlib
+from array import array
+
+
+class Puzzle:
+    # One parsed .clues file. The hints of all lines are kept in two flat buffers, line i owns the entries
+    # offsets[i]:offsets[i + 1] of lengths (block lengths) and colors (character codes of the color letters).
+    __slots__ = ("name", "kind", "dimensions", "palette", "lengths", "colors", "offsets")
+
+    def __init__(self, name, kind, dimensions, palette, lengths, colors, offsets):
+        self.name = name
+        self.kind = kind
+        self.dimensions = dimensions
+        self.palette = palette
+        self.lengths = lengths
+        self.colors = colors
+        self.offsets = offsets
+
+    def __repr__(self):
+        return f"Puzzle({self.name!r}, {self.kind} {' '.join(map(str, self.dimensions))})"
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def shape(self):
+        # Same list of strings the first line of the file splits into, e.g. ['rect', '14', '25']
+        return [self.kind, *map(str, self.dimensions)]
+
+    @property
+    def colored(self):
+        # The first palette entry is the background
+        return len(self.palette) > 2
+
+    def line(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return list(self.lengths[start:end]), [chr(code) for code in self.colors[start:end]]
+
+    @property
+    def hints(self):
+        return [self.line(index) for index in range(len(self))]
+
+
+def expected_hint_lines(kind, dimensions):
+    if kind == "rect":
+        return dimensions[0] + dimensions[1]
+    if kind == "hex":
+        return 3 * (2 * dimensions[0] - 1)
+    raise ValueError("The first line must start with 'rect' or 'hex")
+
+
+def is_header(line):
+    return line.split()[:1] in (["rect"], ["hex"])
+
+
+def parse_puzzle(lines, name=None, header=None):
+    """
+    Parse the lines of one .clues file in a single pass.
+
+    Parameters:
+    - lines: An iterator over the lines, it is only consumed up to the last hint line of this puzzle.
+    - name: Name to remember for the puzzle, usually the file it came from.
+    - header: The shape line, if it was already taken from the iterator.
+
+    Returns:
+    - The Puzzle (None if the iterator holds no further puzzle) and the shape line of the next puzzle if it was read
+      in place of a missing hint line.
+    """
+    if header is None:
+        for header in lines:
+            if header.strip():
+                break
+        else:
+            return None, None
+
+    shape = header.split()
+    kind = shape[0]
+    dimensions = tuple(int(part) for part in shape[1:])
+    palette = next(lines).split()
+
+    lengths = array('H')
+    colors = array('H')
+    offsets = array('I', [0])
+    next_header = None
+    for _ in range(expected_hint_lines(kind, dimensions)):
+        # Lines without blocks may be missing at the end of a puzzle
+        line = "" if next_header else next(lines, "")
+        if is_header(line):
+            next_header = line
+            line = ""
+        for part in line.split():
+            lengths.append(int(part[:-1]))  # Remove 'a' from the end
+            colors.append(ord(part[-1]))  # Extract color ('a')
+        offsets.append(len(lengths))
+
+    return Puzzle(name, kind, dimensions, palette, lengths, colors, offsets), next_header
+
+
+def read_puzzle(filename):
+    with open(filename, 'r') as file:
+        return parse_puzzle(iter(file), str(filename))[0]
+
+
+def iter_puzzles(path):
+    # Yields the puzzles of a directory of .clues files, or of one file with several puzzles after each other,
+    # one at a time so only a single puzzle is held in memory
+    if os.path.isdir(path):
+        for filename in sorted(pathlib.Path(path).glob('*.clues')):
+            yield read_puzzle(filename)
+        return
+
+    with open(path, 'r') as file:
+        lines = iter(file)
+        header = None
+        number = 0
+        while True:
+            puzzle, header = parse_puzzle(lines, f"{path}#{number}", header)
+            if puzzle is None:
+                return
+            yield puzzle
+            number += 1
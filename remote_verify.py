@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import json
+import pathlib
+import random
+import time
+from urllib.parse import urlsplit
+
+from puzzle import parse_puzzle
+from verify import clues_path, collect_solutions, hex_mismatches, rect_mismatches
+
+URL = "http://jfschaefer.de:8973/verify/ss23a31a/nonograms"
+CONCURRENCY = 8  # requests in flight at the same time, one keep-alive connection each
+RETRIES = 3  # further attempts after a transient failure (connection problem, timeout or 5xx answer)
+BACKOFF = 0.5  # seconds before the first retry, doubled for every further one
+REQUEST_TIMEOUT = 30  # seconds
+MAX_COLORS = 9  # the server reads one digit per cell, so colors 'a' to 'i'
+
+
+def server_payload(goal, clues, solution):
+    # The server expects the solution with a header and digits instead of color letters
+    clue_lines = clues.splitlines()
+    too_many = sorted({cell for cell in solution if cell.isalpha() and ord(cell) - ord("a") >= MAX_COLORS})
+    if too_many:
+        raise ValueError(f"The server takes one digit per cell, so at most {MAX_COLORS} colors, "
+                         f"but the solution uses {', '.join(too_many)}")
+    digits = "".join("0" if cell == "-" else str(ord(cell) - ord("a") + 1) if cell.isalpha() else cell
+                     for cell in solution)
+    return {
+        'goal': goal,
+        'clues': clues,
+        'solution': 'anonymous problem\n' + clue_lines[0].split()[0] + '\n' + clue_lines[1] + '\n' + digits,
+    }
+
+
+class Connection:
+    # One HTTP/1.1 connection that is kept open between requests
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                               f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                               f"Connection: keep-alive\r\n\r\n").encode() + body)
+            await self.writer.drain()
+            status, headers, text = await read_message(self.reader)
+        except BaseException:
+            # A half-read answer leaves the connection in an unknown state
+            self.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status.split()[1]), text
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def read_message(reader):
+    # Start line, headers (lower-case names) and body of one HTTP/1.1 request or response
+    start = (await reader.readline()).decode("latin-1").strip()
+    if not start:
+        raise ConnectionError("The connection was closed")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            chunk = await reader.readexactly(size + 2)  # the chunk is followed by CRLF
+            if size == 0:
+                break
+            body += chunk[:-2]
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif start.startswith("HTTP/"):
+        body = await reader.read()
+    else:
+        body = b""
+    return start, headers, body.decode("utf-8", "replace")
+
+
+async def check_solution(connection, path, solution_path, retries=RETRIES, backoff=BACKOFF):
+    # Verdict of the server for one solution file, transient failures are retried with exponential backoff
+    clues = clues_path(solution_path).read_text()
+    body = json.dumps(server_payload('check', clues, solution_path.read_text())).encode()
+    for attempt in range(retries + 1):
+        try:
+            status, text = await asyncio.wait_for(connection.request("GET", path, body), REQUEST_TIMEOUT)
+            if status < 500:
+                return text
+            failure = f"server error {status}"
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as error:
+            failure = f"{type(error).__name__}: {error}"
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random() / 2))
+    return f"error after {retries + 1} attempts ({failure})"
+
+
+async def check_all(solution_paths, url=URL, concurrency=CONCURRENCY, retries=RETRIES, backoff=BACKOFF):
+    """
+    Ask the verification server about many solutions at once.
+
+    Parameters:
+    - solution_paths: The solution files, their .clues files are found like in verify.py.
+    - url: The verification endpoint.
+    - concurrency: Number of requests in flight, every one of them has its own keep-alive connection.
+    - retries: Further attempts after a transient failure.
+    - backoff: Seconds before the first retry, doubled for every further one.
+
+    Returns:
+    - An async generator of (solution path, verdict) in the order the answers arrive.
+    """
+    address = urlsplit(url)
+    pending = asyncio.Queue()
+    for solution_path in solution_paths:
+        pending.put_nowait(pathlib.Path(solution_path))
+    answers = asyncio.Queue()
+
+    async def worker():
+        connection = Connection(address.hostname, address.port or 80)
+        try:
+            while not pending.empty():
+                solution_path = pending.get_nowait()
+                try:
+                    verdict = await check_solution(connection, address.path, solution_path, retries, backoff)
+                except Exception as error:
+                    verdict = f"error: {error}"
+                await answers.put((solution_path, verdict))
+        finally:
+            connection.close()
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, pending.qsize()))]
+    try:
+        for _ in range(len(solution_paths)):
+            yield await answers.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def serve(host, port, fail_rate=0.0):
+    """
+    Local stand-in for the verification server: answers 'check' requests with the offline checks of verify.py.
+
+    fail_rate is the share of requests answered with a 503 error, to try out the retries of the client.
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    _, _, body = await read_message(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    return
+                if random.random() < fail_rate:
+                    status, text = "503 Service Unavailable", "Try again"
+                else:
+                    status, text = "200 OK", local_verdict(json.loads(body))
+                data = text.encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: keep-alive\r\n\r\n".encode() + data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def local_verdict(data):
+    puzzle, _ = parse_puzzle(iter(data['clues'].splitlines()))
+    rows = [row for row in data['solution'].splitlines()[3:] if row.strip()]
+    grid = ["".join("-" if cell == "0" else chr(ord("a") + int(cell) - 1) if cell.isdigit() else cell
+                    for cell in row) for row in rows]
+    mismatches = rect_mismatches(puzzle, grid) if puzzle.kind == "rect" else hex_mismatches(puzzle, grid)
+    return 'Correct' if not mismatches else 'Wrong: ' + '; '.join(mismatches)
+
+
+async def print_verdicts(solution_paths, url, concurrency):
+    correct = 0
+    async for solution_path, verdict in check_all(solution_paths, url, concurrency):
+        print(solution_path.name)
+        print('   ', verdict)
+        correct += verdict == 'Correct'
+    return correct
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Check solutions with the verification server, many at a time.')
+    parser.add_argument('paths', nargs='*', help='solution files or directories of them')
+    parser.add_argument('--url', default=URL, help='verification endpoint')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='requests in flight at the same time')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='run the local stand-in server on this port instead')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of 503 answers of the stand-in server')
+    args = parser.parse_args()
+
+    if args.serve:
+        print(f'Serving checks on http://127.0.0.1:{args.serve}/verify')
+        asyncio.run(serve('127.0.0.1', args.serve, args.fail_rate))
+        return
+
+    solutions = collect_solutions(args.paths)
+    started = time.perf_counter()
+    correct = asyncio.run(print_verdicts(solutions, args.url, args.concurrency))
+    print()
+    print(f'Correct: {correct}, Wrong: {len(solutions) - correct}')
+    print(f'Checked {len(solutions)} solutions in {time.perf_counter() - started:.2f} seconds')
+
+
+if __name__ == '__main__':
+    main_cli()
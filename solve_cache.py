@@ -0,0 +1,111 @@
+import hashlib
+import os
+from array import array
+
+CACHE_DIR = ".nonogram_cache"
+CACHE_SIZE = 256 * 1024 * 1024  # bytes, the least recently used entries are removed above this
+
+
+def puzzle_key(puzzle, *settings):
+    # Canonical hash of a puzzle: the parsed shape, palette and hint buffers, so formatting differences of the
+    # .clues file (spacing, missing empty lines at the end) lead to the same key. The settings (encoder name and
+    # version, ...) are part of the key, a changed encoder never reads clauses of an older one.
+    digest = hashlib.sha256()
+    digest.update(f"{puzzle.kind} {' '.join(map(str, puzzle.dimensions))}\n".encode())
+    digest.update(f"{' '.join(puzzle.palette)}\n".encode())
+    for buffer in (puzzle.lengths, puzzle.colors, puzzle.offsets):
+        digest.update(array('I', buffer).tobytes())
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+
+class SolveCache:
+    # On-disk cache of encoded clauses (<key>.cnf) and solve results (<key>.sol) of puzzles.
+    #
+    # The clauses are stored as one flat array('i') of literals with a 0 after every clause, like DIMACS without the
+    # text. A result file holds the status on its first line and the rows of the solution grid after it. Files are
+    # written to a temporary name and renamed, so worker processes can share one cache directory. Reading an entry
+    # updates its modification time, which is what the LRU eviction goes by.
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _read(self, path, mode):
+        try:
+            with open(path, mode) as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _write(self, path, data, mode):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, mode) as file:
+            file.write(data)
+        os.replace(temporary, path)
+        self.evict()
+
+    def load_cnf(self, key):
+        data = self._read(self._path(key, ".cnf"), "rb")
+        if data is None:
+            return None
+        literals = array('i')
+        literals.frombytes(data)
+        clauses = []
+        clause = []
+        for literal in literals:
+            if literal:
+                clause.append(literal)
+            else:
+                clauses.append(clause)
+                clause = []
+        return clauses
+
+    def store_cnf(self, key, clauses):
+        literals = array('i')
+        for clause in clauses:
+            literals.extend(clause)
+            literals.append(0)
+        self._write(self._path(key, ".cnf"), literals.tobytes(), "wb")
+
+    def load_result(self, key):
+        # (status, grid) of an earlier run, grid is None for unsatisfiable puzzles
+        data = self._read(self._path(key, ".sol"), "r")
+        if data is None:
+            return None
+        status, *rows = data.splitlines()
+        return status, [list(row) for row in rows] or None
+
+    def store_result(self, key, status, grid=None):
+        rows = ["".join(row) for row in grid or []]
+        self._write(self._path(key, ".sol"), "\n".join([status, *rows]) + "\n", "w")
+
+    def evict(self):
+        # Remove the least recently used entries until the cache fits into max_bytes again
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith((".cnf", ".sol")):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
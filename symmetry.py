@@ -0,0 +1,169 @@
+import argparse
+import contextlib
+import io
+from itertools import permutations
+
+from pysat.formula import IDPool
+from pysat.solvers import Solver
+
+from hex_geometry import hex_geometry
+
+
+def rect_transforms(rows, cols):
+    # (name, (row, column) -> (row, column)) for the mirrors and rotations of the board, the transposes only if square
+    transforms = [
+        ("mirror left-right", lambda r, c: (r, cols - 1 - c)),
+        ("mirror top-bottom", lambda r, c: (rows - 1 - r, c)),
+        ("rotation 180", lambda r, c: (rows - 1 - r, cols - 1 - c)),
+    ]
+    if rows == cols:
+        transforms += [
+            ("transpose", lambda r, c: (c, r)),
+            ("anti-transpose", lambda r, c: (cols - 1 - c, rows - 1 - r)),
+            ("rotation 90", lambda r, c: (c, rows - 1 - r)),
+            ("rotation 270", lambda r, c: (cols - 1 - c, r)),
+        ]
+    return transforms
+
+
+def hex_transforms():
+    # The 12 symmetries of a hexagon are the permutations of the cube coordinates, with or without negating all three
+    transforms = []
+    for order in permutations(range(3)):
+        for sign in (1, -1):
+            if order == (0, 1, 2) and sign == 1:
+                continue
+            name = "(x, y, z) -> (" + ", ".join(("" if sign == 1 else "-") + "xyz"[i] for i in order) + ")"
+            transforms.append((name, lambda x, y, z, order=order, sign=sign:
+                               tuple(sign * (x, y, z)[i] for i in order)))
+    return transforms
+
+
+def cell_permutations(shape):
+    # (name, permutation) of every symmetry of the board shape, permutation[cell] is the cell it is moved to
+    if shape[0] == "rect":
+        rows, cols = int(shape[1]), int(shape[2])
+        return [(name, [row * cols + col for row, col in (transform(r, c) for r in range(rows) for c in range(cols))])
+                for name, transform in rect_transforms(rows, cols)]
+    geometry = hex_geometry(int(shape[1]))
+    return [(name, [geometry.cell_ids[transform(*coordinates)] - 1 for coordinates in geometry.cells])
+            for name, transform in hex_transforms()]
+
+
+def keeps_hints(permutation, lines):
+    # A symmetry of the board maps every line onto a line, forwards or backwards. It maps solutions onto solutions
+    # if every line has the same hints as its image, read in the same direction.
+    by_cells = {frozenset(cells): (cells, hint_numbers, hint_colors)
+                for _, _, cells, hint_numbers, hint_colors in lines}
+    for _, _, cells, hint_numbers, hint_colors in lines:
+        image = [permutation[cell] for cell in cells]
+        target_cells, target_numbers, target_colors = by_cells[frozenset(image)]
+        if image == target_cells:
+            same = target_numbers == hint_numbers and target_colors == hint_colors
+        else:
+            same = target_numbers[::-1] == hint_numbers and target_colors[::-1] == hint_colors
+        if not same:
+            return False
+    return True
+
+
+def board_symmetries(shape, lines):
+    """
+    Find the symmetries of the board that the hints have as well.
+
+    Every mirror and rotation of the board is tried. One that moves every line onto a line with the same hints (in the
+    direction it is moved) turns every solution into a solution, so only one solution of every group of symmetric
+    ones has to be looked for.
+
+    Parameters:
+    - shape: The first line of the .clues file.
+    - lines: The lines of the puzzle, as main.puzzle_lines returns them.
+
+    Returns:
+    - (name, permutation) of every such symmetry, permutation[cell] is the 0-based cell a cell is moved to.
+    """
+    return [(name, permutation) for name, permutation in cell_permutations(shape) if keeps_hints(permutation, lines)]
+
+
+def duplicate_lines(lines):
+    # Groups of lines with the same length and hints, the ones line templates are shared between
+    groups = {}
+    for axis, index, cells, hint_numbers, hint_colors in lines:
+        groups.setdefault((len(cells), tuple(hint_numbers), tuple(hint_colors)), []).append((axis, index))
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def lex_leader_clauses(permutation, pool):
+    # The cells (variables 1..N) read in order are lexicographically at most the cells moved by the permutation.
+    # equal is true while all cells so far agree with their images; as long as it is, a filled cell needs a filled
+    # image. Cells the permutation keeps in place compare equal and are skipped.
+    clauses = []
+    equal = None
+    for cell, image in enumerate(permutation):
+        if image == cell:
+            continue
+        a, b = cell + 1, image + 1
+        condition = [] if equal is None else [-equal]
+        clauses.append([*condition, -a, b])
+        following = pool.id()
+        clauses.append([*condition, -a, following])
+        clauses.append([*condition, b, following])
+        equal = following
+    return clauses
+
+
+def symmetry_breaking_clauses(symmetries, pool):
+    """
+    Lex-leader clauses for the symmetries of a puzzle.
+
+    For every symmetry, the cells read in variable order must be lexicographically at most their image. Among all
+    solutions that the symmetries turn into each other, the lexicographically smallest one meets every one of these
+    constraints at once, so a satisfiable puzzle stays satisfiable. Only the other members of its group are excluded.
+
+    Parameters:
+    - symmetries: (name, permutation) as board_symmetries returns them.
+    - pool: An IDPool above all variables of the puzzle, the helper variables are taken from it.
+
+    Returns:
+    - The clauses, O(N) per symmetry for N cells.
+    """
+    clauses = []
+    for _, permutation in symmetries:
+        clauses.extend(lex_leader_clauses(permutation, pool))
+    return clauses
+
+
+def conflicts(clauses):
+    with Solver(name='minisat22', bootstrap_with=clauses) as solver:
+        solver.solve()
+        return solver.accum_stats()["conflicts"]
+
+
+def main_cli():
+    from batch import collect_puzzles
+    from main import Encoder
+    from puzzle import read_puzzle
+
+    parser = argparse.ArgumentParser(description='Find symmetries and duplicate lines of puzzles and show what '
+                                                 'breaking the symmetries saves the SAT solver.')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of .clues files')
+    args = parser.parse_args()
+
+    for filename in collect_puzzles(args.paths):
+        puzzle = read_puzzle(filename)
+        encoder = Encoder(puzzle.shape, puzzle.hints)
+        with contextlib.redirect_stdout(io.StringIO()):
+            clauses = encoder.encode()
+        symmetries = board_symmetries(puzzle.shape, encoder.lines)
+        duplicates = duplicate_lines(encoder.lines)
+        print(f'{filename}: {len(duplicates)} groups of duplicate lines '
+              f'({sum(len(group) for group in duplicates)} lines), '
+              f'{len(symmetries)} symmetries{": " if symmetries else ""}{", ".join(name for name, _ in symmetries)}')
+        if symmetries:
+            breaking = symmetry_breaking_clauses(symmetries, IDPool(start_from=encoder.pool.top + 1))
+            print(f'    {len(breaking)} clauses added, at most {len(symmetries) + 1} symmetric solutions per group, '
+                  f'conflicts {conflicts(clauses)} -> {conflicts(clauses + breaking)}')
+
+
+if __name__ == '__main__':
+    main_cli()
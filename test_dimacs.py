@@ -0,0 +1,12 @@
+from pysat.solvers import Solver
+
+from dimacs import iter_dimacs, load_dimacs
+
+
+def test_satlib_footer_is_not_an_empty_clause(tmp_path):
+    path = tmp_path / "satlib.cnf"
+    path.write_text("c SATLIB style\np cnf 2 2\n1 -2 0\n2 0\n%\n0\n\n")
+    assert list(iter_dimacs(path)) == [[1, -2], [2]]
+    with Solver(name='minisat22') as solver:
+        assert load_dimacs(path, solver) == 2
+        assert solver.solve()
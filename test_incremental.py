@@ -0,0 +1,34 @@
+import pytest
+
+from conftest import count_solutions, random_puzzles
+from incremental import IncrementalSolver
+
+OVERLONG_SHAPE = ['rect', '1', '3']
+OVERLONG_HINTS = [([4], ['a']), ([], []), ([], []), ([], [])]
+
+
+@pytest.mark.parametrize('propagate_lines', [True, False])
+def test_overlong_hint_has_no_solution(propagate_lines):
+    with IncrementalSolver(OVERLONG_SHAPE, OVERLONG_HINTS, propagate_lines=propagate_lines) as solver:
+        assert solver.count_solutions() == 0
+        assert not solver.is_unique()
+        assert solver.solve() is None
+
+
+@pytest.mark.parametrize('propagate_lines', [True, False])
+def test_diagonals_have_two_solutions(propagate_lines):
+    hints = [([1], ['a'])] * 4
+    with IncrementalSolver(['rect', '2', '2'], hints, propagate_lines=propagate_lines) as solver:
+        assert sorted(solver.solutions()) == [[['-', 'a'], ['a', '-']], [['a', '-'], ['-', 'a']]]
+        assert not solver.is_unique()
+        # Every call starts from the original puzzle again
+        assert solver.count_solutions() == 2
+        assert solver.is_unique([solver.cell_literal(0, 'a')])
+
+
+def test_solution_counts_match_brute_force():
+    for shape, colors, hints in random_puzzles(seed=4, count=40):
+        expected = count_solutions(shape, colors, hints)
+        with IncrementalSolver(shape, hints) as solver:
+            assert solver.count_solutions(expected + 1) == expected, (shape, hints)
+            assert solver.is_unique() == (expected == 1)
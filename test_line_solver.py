@@ -0,0 +1,67 @@
+import random
+from itertools import product
+
+import pytest
+
+from line_solver import EMPTY, count_placements, placements, solve_line
+
+RED, BLUE = 2, 4
+
+
+def brute_force_placements(domains, blocks, bits):
+    # Every assignment of states to the cells that the domains allow and whose runs are the blocks
+    found = []
+    for row in product((EMPTY, RED, BLUE), repeat=len(domains)):
+        if any(not state & domain for state, domain in zip(row, domains)):
+            continue
+        runs = []
+        previous = EMPTY
+        for state in row:
+            if state != EMPTY:
+                if state == previous:
+                    runs[-1][0] += 1
+                else:
+                    runs.append([1, state])
+            previous = state
+        if runs == [[block, bit] for block, bit in zip(blocks, bits)]:
+            found.append(list(row))
+    return found
+
+
+def random_lines(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        n = rng.randint(1, 7)
+        num_blocks = rng.randint(0, 3)
+        blocks = [rng.randint(1, n + 1) for _ in range(num_blocks)]
+        bits = [rng.choice((RED, BLUE)) for _ in range(num_blocks)]
+        domains = [rng.choice((EMPTY | RED | BLUE, EMPTY | RED | BLUE, EMPTY | RED, RED | BLUE, EMPTY, RED, BLUE))
+                   for _ in range(n)]
+        yield domains, blocks, bits
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_placements_match_brute_force(seed):
+    for domains, blocks, bits in random_lines(seed, 100):
+        expected = brute_force_placements(domains, blocks, bits)
+        assert count_placements(domains, blocks, bits) == len(expected)
+        assert sorted(placements(domains, blocks, bits)) == sorted(expected)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_solve_line_keeps_exactly_the_states_of_some_placement(seed):
+    for domains, blocks, bits in random_lines(seed, 100):
+        expected = brute_force_placements(domains, blocks, bits)
+        if not expected:
+            assert solve_line(domains, blocks, bits) is None
+            continue
+        narrowed = [0] * len(domains)
+        for row in expected:
+            narrowed = [domain | state for domain, state in zip(narrowed, row)]
+        assert solve_line(domains, blocks, bits) == narrowed
+
+
+def test_overlong_block_has_no_placement():
+    assert count_placements([EMPTY | RED] * 3, [4], [RED]) == 0
+    assert list(placements([EMPTY | RED] * 3, [4], [RED])) == []
+    assert solve_line([EMPTY | RED] * 3, [4], [RED]) is None
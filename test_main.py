@@ -0,0 +1,59 @@
+import pytest
+from pysat.solvers import Solver
+
+from conftest import count_solutions, random_puzzles
+from main import Encoder, clause_solver, conflicting_lines, report_conflict
+
+# rect 1 3: one row of three cells whose hint needs four, the columns have no blocks
+OVERLONG_SHAPE = ['rect', '1', '3']
+OVERLONG_HINTS = [([4], ['a']), ([], []), ([], []), ([], [])]
+
+
+@pytest.mark.parametrize('line_encoding', ['starts', 'automaton'])
+@pytest.mark.parametrize('encoding', ['pairwise', 'sequential', 'commander', 'product', 'cardenc'])
+def test_overlong_hint_is_unsatisfiable(encoding, line_encoding):
+    clauses = Encoder(OVERLONG_SHAPE, OVERLONG_HINTS, encoding, line_encoding=line_encoding).encode()
+    assert clause_solver(clauses) is None
+
+
+def test_second_block_without_room_is_unsatisfiable():
+    # Both blocks fit on their own, but not with the gap between them
+    hints = [([2, 2], ['a', 'a']), ([1], ['a']), ([1], ['a']), ([1], ['a']), ([1], ['a'])]
+    assert clause_solver(Encoder(['rect', '1', '4'], hints).encode()) is None
+
+
+def test_conflicting_lines_names_the_overlong_line():
+    assert conflicting_lines(OVERLONG_SHAPE, OVERLONG_HINTS) == [('r', 0)]
+    result = {}
+    report_conflict(OVERLONG_SHAPE, OVERLONG_HINTS, result)
+    assert result['conflict'] == ['row 0: 4a']
+
+
+def test_conflicting_lines_of_crossing_lines():
+    # The only cell is filled by its row and empty by its column
+    hints = [([1], ['a']), ([], [])]
+    assert conflicting_lines(['rect', '1', '1'], hints) == [('c', 0), ('r', 0)]
+    assert conflicting_lines(['rect', '1', '1'], [([1], ['a']), ([1], ['a'])]) == []
+
+
+def count_models(encoder, limit):
+    # Models that differ on the grid: the cells and, for colored puzzles, their color variables
+    grid_variables = range(1, encoder.num_cells * (len(encoder.colors) + 1) + 1)
+    found = 0
+    with Solver(name='minisat22', bootstrap_with=encoder.encode()) as solver:
+        while found < limit and solver.solve():
+            model = solver.get_model()
+            solver.add_clause([-model[v - 1] for v in grid_variables])
+            found += 1
+    return found
+
+
+@pytest.mark.parametrize('encoding, line_encoding', [
+    ('pairwise', 'starts'), ('sequential', 'starts'), ('commander', 'starts'), ('product', 'starts'),
+    ('cardenc', 'starts'), ('auto', 'automaton'),
+])
+def test_solution_counts_match_brute_force(encoding, line_encoding):
+    for shape, colors, hints in random_puzzles(seed=1, count=60):
+        expected = count_solutions(shape, colors, hints)
+        encoder = Encoder(shape, hints, encoding, line_encoding=line_encoding)
+        assert count_models(encoder, expected + 1) == expected, (shape, hints)
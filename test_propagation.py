@@ -0,0 +1,27 @@
+from conftest import random_puzzles, solutions
+from line_solver import EMPTY
+from main import puzzle_lines
+from propagation import color_bits, grid_size, initial_domains, is_solved, propagate
+
+
+def test_propagation_keeps_every_solution():
+    for shape, colors, hints in random_puzzles(seed=2, count=40):
+        lines = puzzle_lines(shape, hints)
+        bits = color_bits(lines)
+        domains = propagate(lines, initial_domains(grid_size(lines), bits), bits)
+        found = solutions(shape, colors, hints)
+        if domains is None:
+            assert not found, (shape, hints)
+            continue
+        states = [{EMPTY if cell == '-' else bits[cell] for cell in grid} for grid in zip(*found)]
+        for cell_states, domain in zip(states, domains):
+            assert all(state & domain for state in cell_states), (shape, hints)
+        if is_solved(domains):
+            assert len(found) == 1
+            assert [EMPTY if cell == '-' else bits[cell] for cell in found[0]] == domains
+
+
+def test_overlong_hint_is_found_by_propagation():
+    lines = puzzle_lines(['rect', '1', '3'], [([4], ['a']), ([], []), ([], []), ([], [])])
+    bits = color_bits(lines)
+    assert propagate(lines, initial_domains(grid_size(lines), bits), bits) is None
@@ -0,0 +1,26 @@
+import random
+from itertools import product
+
+from conftest import clues_text, grid_rows, hints_key, hints_of, num_cells, random_puzzles
+from puzzle import parse_puzzle
+from verify import hex_mismatches, rect_mismatches
+
+
+def mismatches(puzzle, rows):
+    return rect_mismatches(puzzle, rows) if puzzle.kind == 'rect' else hex_mismatches(puzzle, rows)
+
+
+def test_verifier_accepts_exactly_the_grids_with_the_hints():
+    rng = random.Random(3)
+    for shape, colors, hints in random_puzzles(seed=3, count=30):
+        puzzle, _ = parse_puzzle(iter(clues_text(shape, colors, hints).splitlines()))
+        grids = list(product('-' + colors, repeat=num_cells(shape)))
+        for grid in rng.sample(grids, min(len(grids), 200)):
+            correct = hints_key(hints_of(shape, grid)) == hints_key(hints)
+            assert (not mismatches(puzzle, grid_rows(shape, grid))) == correct, (shape, hints, grid)
+
+
+def test_verifier_names_the_wrong_lines():
+    puzzle, _ = parse_puzzle(iter(clues_text(['rect', '2', '2'], 'a', [([2], ['a']), ([], []),
+                                                                       ([1], ['a']), ([1], ['a'])]).splitlines()))
+    assert mismatches(puzzle, ['a-', '--']) == ['row 0: expected 2a, found 1a', 'column 1: expected 1a, found (empty)']
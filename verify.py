@@ -0,0 +1,183 @@
+import argparse
+import os
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from hex_geometry import AXES, hex_geometry
+from puzzle import read_puzzle
+
+EMPTY_CELL = ord('-')
+
+
+def clues_path(solution_path):
+    # Inverse of the naming in main.write_grid_to_file: solutions/x.solutions -> clues/x.clues,
+    # generated_solutions/x.solutions -> generated/x.clues. Only the directory of the file and its suffix are mapped,
+    # the rest of the path is left alone.
+    solution_path = pathlib.Path(solution_path)
+    directory = solution_path.parent
+    if directory.name == "solutions":
+        directory = directory.with_name("clues")
+    elif directory.name.endswith("_solutions"):
+        directory = directory.with_name(directory.name[:-len("_solutions")])
+    return directory / (solution_path.stem + ".clues")
+
+
+def read_grid(solution_path):
+    with open(solution_path) as file:
+        return [line.rstrip("\n") for line in file if line.strip()]
+
+
+def line_runs(cells):
+    # (length, color code) of every block in a sequence of color codes, empty cells are EMPTY_CELL
+    runs = []
+    previous = EMPTY_CELL
+    for cell in cells:
+        if cell != EMPTY_CELL:
+            if cell == previous:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, cell])
+        previous = cell
+    return [tuple(run) for run in runs]
+
+
+def format_runs(runs):
+    return " ".join(f"{length}{chr(color)}" for length, color in runs) or "(empty)"
+
+
+def _rect_mismatches(codes, puzzle, first_line):
+    # Compare the blocks of every row of codes with the hints of lines first_line, first_line + 1, ...
+    # All rows are handled at once: a block starts where a cell is filled and differs from its left neighbor and ends
+    # where it differs from its right neighbor, reading the starts and ends in row order pairs them up.
+    num_lines = codes.shape[0]
+    filled = codes != EMPTY_CELL
+    padded = np.pad(codes, ((0, 0), (1, 1)), constant_values=EMPTY_CELL)
+    start_rows, start_cols = np.nonzero(filled & (codes != padded[:, :-2]))
+    _, end_cols = np.nonzero(filled & (codes != padded[:, 2:]))
+    found_lengths = end_cols - start_cols + 1
+    found_colors = codes[start_rows, start_cols]
+    found_counts = np.bincount(start_rows, minlength=num_lines)
+
+    offsets = np.asarray(puzzle.offsets[first_line:first_line + num_lines + 1], dtype=np.int64)
+    expected_lengths = np.asarray(puzzle.lengths[offsets[0]:offsets[-1]], dtype=np.int64)
+    expected_colors = np.asarray(puzzle.colors[offsets[0]:offsets[-1]], dtype=np.int64)
+    expected_counts = np.diff(offsets)
+
+    # Lines with the same number of blocks line up element by element once the other lines are left out
+    same_count = found_counts == expected_counts
+    wrong = ~same_count
+    found_kept = np.repeat(same_count, found_counts)
+    expected_kept = np.repeat(same_count, expected_counts)
+    differs = ((found_lengths[found_kept] != expected_lengths[expected_kept])
+               | (found_colors[found_kept] != expected_colors[expected_kept]))
+    wrong[np.repeat(np.arange(num_lines), expected_counts)[expected_kept][differs]] = True
+
+    found_starts = np.concatenate(([0], np.cumsum(found_counts)))
+    mismatches = []
+    for line in np.nonzero(wrong)[0]:
+        found = slice(found_starts[line], found_starts[line + 1])
+        mismatches.append((int(line), list(zip(found_lengths[found].tolist(), found_colors[found].tolist()))))
+    return mismatches
+
+
+def rect_mismatches(puzzle, grid):
+    rows, cols = puzzle.dimensions
+    if len(grid) != rows or any(len(row) != cols for row in grid):
+        return [f"the grid is not {rows} x {cols}"]
+    codes = np.frombuffer("".join(grid).encode("latin-1"), dtype=np.uint8).reshape(rows, cols).astype(np.int64)
+
+    mismatches = []
+    for axis, first_line, lines in (("row", 0, codes), ("column", rows, codes.T)):
+        for index, found in _rect_mismatches(np.ascontiguousarray(lines), puzzle, first_line):
+            expected = puzzle.line(first_line + index)
+            mismatches.append(f"{axis} {index}: expected {format_runs(zip(expected[0], map(ord, expected[1])))}, "
+                              f"found {format_runs(found)}")
+    return mismatches
+
+
+def hex_mismatches(puzzle, grid):
+    geometry = hex_geometry(puzzle.dimensions[0])
+    if [len(row) for row in grid] != geometry.row_lengths:
+        return [f"the grid does not have the rows of a hex board with edge length {geometry.edge}"]
+    cells = [ord(grid[row][col]) for row, col in geometry.positions]
+
+    mismatches = []
+    hint_length = 2 * geometry.edge - 1
+    for axis_number, axis in enumerate(AXES):
+        for i, line_cells in enumerate(geometry.hint_cells[axis]):
+            hint_numbers, hint_colors = puzzle.line(axis_number * hint_length + i)
+            expected = list(zip(hint_numbers, map(ord, hint_colors)))
+            found = line_runs(cells[cell] for cell in line_cells)
+            if found != expected:
+                mismatches.append(f"{axis} {i - geometry.edge + 1}: expected {format_runs(expected)}, "
+                                  f"found {format_runs(found)}")
+    return mismatches
+
+
+def verify(clues_file, solution_file):
+    """
+    Check a solution grid against the hints of its puzzle without asking the server.
+
+    Parameters:
+    - clues_file: The .clues file.
+    - solution_file: The grid in the format the solvers write, one row per line, '-' for empty cells.
+
+    Returns:
+    - The mismatching lines as readable messages, an empty list if the solution is correct.
+    """
+    puzzle = read_puzzle(clues_file)
+    grid = read_grid(solution_file)
+    if puzzle.kind == "rect":
+        return rect_mismatches(puzzle, grid)
+    return hex_mismatches(puzzle, grid)
+
+
+def verify_file(solution_file):
+    clues_file = clues_path(solution_file)
+    if not clues_file.exists():
+        return str(solution_file), [f"no clues file {clues_file}"]
+    return str(solution_file), verify(clues_file, solution_file)
+
+
+def collect_solutions(paths):
+    solutions = []
+    for path in paths:
+        if os.path.isdir(path):
+            solutions.extend(sorted(solution for solution in pathlib.Path(path).iterdir()
+                                    if solution.suffix in ('.solution', '.solutions')))
+        else:
+            solutions.append(pathlib.Path(path))
+    return solutions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Check solution files against their .clues files offline.')
+    parser.add_argument('paths', nargs='+', help='solution files or directories of them')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    args = parser.parse_args()
+
+    solutions = collect_solutions(args.paths)
+    if args.workers > 1 and len(solutions) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(verify_file, solutions, chunksize=max(1, len(solutions) // args.workers)))
+    else:
+        results = [verify_file(solution) for solution in solutions]
+
+    correct = 0
+    for solution_file, mismatches in results:
+        print(pathlib.Path(solution_file).name)
+        print('   ', 'Correct' if not mismatches else 'Wrong')
+        for mismatch in mismatches:
+            print('       ', mismatch)
+        correct += not mismatches
+
+    print()
+    print(f'Correct: {correct}, Wrong: {len(results) - correct}')
+    return 0 if correct == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
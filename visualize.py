@@ -0,0 +1,106 @@
+import argparse
+import html
+import math
+import pathlib
+
+from hex_geometry import hex_geometry
+from puzzle import read_puzzle
+from verify import clues_path, collect_solutions, hex_mismatches, read_grid, rect_mismatches
+
+CELL_SIZE = 16  # pixels, side of a square or radius of a hexagon
+
+
+def cell_fill(puzzle, cell):
+    # '-' is the background (first palette entry), 'a' the second entry and so on
+    if cell == '-':
+        return puzzle.palette[0]
+    index = ord(cell) - ord('a') + 1
+    return puzzle.palette[index] if 0 < index < len(puzzle.palette) else '#ff00ff'  # unknown letters stand out
+
+
+def rect_svg(puzzle, grid):
+    rows, cols = puzzle.dimensions
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{cols * CELL_SIZE}" height="{rows * CELL_SIZE}">']
+    for row, cells in enumerate(grid):
+        for col, cell in enumerate(cells):
+            parts.append(f'<rect x="{col * CELL_SIZE}" y="{row * CELL_SIZE}" width="{CELL_SIZE}" '
+                         f'height="{CELL_SIZE}" fill="{cell_fill(puzzle, cell)}" stroke="#cccccc"/>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def hex_svg(puzzle, grid):
+    # Pointy-top hexagons, every x level is one row of the picture like in the solution file
+    geometry = hex_geometry(puzzle.dimensions[0])
+    width = math.sqrt(3) * CELL_SIZE
+    corners = [(CELL_SIZE * math.cos(math.radians(60 * i - 30)), CELL_SIZE * math.sin(math.radians(60 * i - 30)))
+               for i in range(6)]
+
+    centers = geometry.centers(CELL_SIZE)
+    left = min(cx for cx, _ in centers) - width / 2
+    top = min(cy for _, cy in centers) - CELL_SIZE
+    picture_width = max(cx for cx, _ in centers) - left + width / 2
+    picture_height = max(cy for _, cy in centers) - top + CELL_SIZE
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{picture_width:.0f}" height="{picture_height:.0f}">']
+    for (cx, cy), (row, col) in zip(centers, geometry.positions):
+        points = " ".join(f'{cx - left + dx:.1f},{cy - top + dy:.1f}' for dx, dy in corners)
+        parts.append(f'<polygon points="{points}" fill="{cell_fill(puzzle, grid[row][col])}" stroke="#cccccc"/>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def render_svg(puzzle, grid):
+    """
+    Draw a solution grid with the colors of the puzzle's palette.
+
+    Parameters:
+    - puzzle: The parsed .clues file.
+    - grid: The rows of the solution file, as the solvers write them.
+
+    Returns:
+    - The picture as an SVG string, or None if the grid does not fit the board.
+    """
+    if puzzle.kind == "rect":
+        if len(grid) != puzzle.dimensions[0] or any(len(row) != puzzle.dimensions[1] for row in grid):
+            return None
+        return rect_svg(puzzle, grid)
+    if [len(row) for row in grid] != hex_geometry(puzzle.dimensions[0]).row_lengths:
+        return None
+    return hex_svg(puzzle, grid)
+
+
+def render_solution(solution_path):
+    # HTML section of one solution: its name, whether it is correct and the picture
+    solution_path = pathlib.Path(solution_path)
+    puzzle = read_puzzle(clues_path(solution_path))
+    grid = read_grid(solution_path)
+    mismatches = rect_mismatches(puzzle, grid) if puzzle.kind == "rect" else hex_mismatches(puzzle, grid)
+    picture = render_svg(puzzle, grid) or '<p>The grid does not fit the board.</p>'
+    status = 'Correct' if not mismatches else f'Wrong ({len(mismatches)} lines)'
+    return (f'<section><h2>{html.escape(solution_path.stem)}</h2><p>{status}</p>{picture}'
+            f'{"".join(f"<pre>{html.escape(mismatch)}</pre>" for mismatch in mismatches)}</section>')
+
+
+def render_page(solution_paths, title="Nonogram solutions"):
+    sections = "\n".join(render_solution(path) for path in solution_paths)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>section {{display: inline-block; vertical-align: top; margin: 1em;}}</style></head>\n'
+            f'<body>\n<h1>{html.escape(title)}</h1>\n{sections}\n</body></html>\n')
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Draw solution files into one HTML page, without the server.')
+    parser.add_argument('paths', nargs='+', help='solution files or directories of them')
+    parser.add_argument('--output', default=None, help='HTML file to write (default: index.html in the first path)')
+    args = parser.parse_args()
+
+    solutions = collect_solutions(args.paths)
+    first = pathlib.Path(args.paths[0])
+    output = pathlib.Path(args.output) if args.output else (first if first.is_dir() else first.parent) / 'index.html'
+    output.write_text(render_page(solutions))
+    print(f'Drew {len(solutions)} solutions into {output}')
+
+
+if __name__ == '__main__':
+    main_cli()